@@ -0,0 +1,68 @@
+"""Пропускная способность проверки паролей при входе.
+
+Сравнивает pwd_context.verify прямо в event loop (как было в /login)
+с пулом из src.passwords и показывает, насколько при этом замирает loop.
+
+    cd backend
+    python -m benchmarks.bench_login --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+from src.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE
+from src.passwords import pwd_context, verify_and_update_password
+
+
+async def heartbeat(stop: asyncio.Event, stalls: list[float], interval: float = 0.005):
+    # насколько позже запланированного просыпается loop
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - started - interval)
+
+
+async def inline_verify(password: str, password_hash: str):
+    return pwd_context.verify(password, password_hash)
+
+
+async def run(verify, logins: int, concurrency: int, password: str, password_hash: str) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    stalls: list[float] = []
+    beat = asyncio.create_task(heartbeat(stop, stalls))
+
+    async def one():
+        async with semaphore:
+            await verify(password, password_hash)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await beat
+    return {
+        "logins_per_sec": round(logins / elapsed, 1),
+        "elapsed_s": round(elapsed, 3),
+        "max_loop_stall_ms": round(max(stalls, default=0) * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    password = "correct horse battery staple"
+    password_hash = pwd_context.hash(password)
+
+    print("inline:", await run(inline_verify, args.logins, args.concurrency, password, password_hash))
+    # больше одновременных запросов пул не примет и начнёт отвечать 503
+    pool_concurrency = min(args.concurrency, PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+    print("pool:  ", await run(verify_and_update_password, args.logins, pool_concurrency, password, password_hash))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,192 @@
+"""Проверка планов запросов и числа запросов к базе на каждый эндпоинт.
+
+Прогоняет эндпоинты app.py внутри процесса (httpx + ASGI) от имени директора, админа и специалиста,
+перехватывает все SQL-запросы через before_cursor_execute и для каждого делает EXPLAIN
+с теми же параметрами на заполненной базе (см. benchmarks/seed.py). Падает с кодом 1, если:
+
+  * в плане есть Seq Scan по appointments (или другой таблице из --tables)
+    с оценкой больше --max-seq-rows строк;
+  * эндпоинт сделал больше запросов, чем указано в его бюджете.
+
+    cd backend
+    python -m benchmarks.seed --truncate
+    python -m benchmarks.check_plans
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+import asyncpg
+import httpx
+from sqlalchemy import event
+
+from src.app import app, encode_cursor
+from src.config import ASYNCPG_DSN
+from src.db_init import engine, replica_engine
+
+from .seed import DIRECTOR_EMAIL
+
+
+ROLES = {
+    "director": DIRECTOR_EMAIL,
+    "admin": "bench-admin-baitursynov@example.com",
+    "employee": "bench-baitursynov-0@example.com",
+}
+
+# (название, метод, путь, бюджет запросов); {day}, {month_start}, {month_end} подставляются из --date,
+# {since} — курсор /appointments/changes на час назад.
+# в бюджет входит поиск пользователя в get_current_user_data, если его нет в кэше
+CASES = [
+    ("appointments_page", "GET", "/appointments?limit=100&date_from={day}&date_to={day}", 2),
+    ("appointments_first_page", "GET", "/appointments?limit=100", 2),
+    ("appointments_by_date", "GET", "/appointments_by_date/{day}", 2),
+    ("appointments_by_date_branch", "GET", "/appointments_by_date/{day}?branch=gagarina", 2),
+    ("appointments_by_datetime", "GET", "/appointments_by_datetime/{day}T18:00:00", 2),
+    ("appointments_by_timeslot", "GET", "/appointments_by_timeslot/{day}/18:00", 2),
+    ("salaries", "GET", "/salaries?start_date={month_start}&end_date={month_end}", 2),
+    ("statistics", "GET", "/statistics?date_from={month_start}&date_to={month_end}&group_by=specialist", 2),
+    ("occupancy", "GET", "/occupancy?date_from={month_start}&date_to={month_end}", 2),
+    ("free_slots", "GET", "/free_slots?date_from={day}&date_to={day}", 2),
+    ("clients", "GET", "/clients?limit=100", 2),
+    ("clients_search", "GET", "/clients/search?q=Ким", 2),
+    ("specialists", "GET", "/specialists", 2),
+    ("appointment_changes", "GET", "/appointments/changes?since={since}", 4),
+]
+# создание, завершение и удаление тестовой записи — после прогона база та же
+WRITE_BUDGETS = {"create_appointment": 2, "finish_appointment": 2, "delete_appointment": 2}
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+
+class Capture:
+    def __init__(self):
+        self.statements: list[tuple[str, tuple]] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            self.statements.append((statement, tuple(parameters or ())))
+
+    def take(self) -> list[tuple[str, tuple]]:
+        statements, self.statements = self.statements, []
+        return statements
+
+
+def seq_scans(plan: dict, table_rows: dict[str, float], max_rows: int) -> list[str]:
+    # Plan Rows — оценка строк после фильтра, а читает Seq Scan всю таблицу: сравниваем её размер
+    found = []
+    relation = plan.get("Relation Name")
+    if plan.get("Node Type") == "Seq Scan" and relation in table_rows and table_rows[relation] > max_rows:
+        found.append(f"Seq Scan on {relation} (~{int(table_rows[relation])} rows in table)")
+    for child in plan.get("Plans", ()):
+        found += seq_scans(child, table_rows, max_rows)
+    return found
+
+
+async def run_requests(client: httpx.AsyncClient, capture: Capture, params: dict, specialist_id: int, client_id: int):
+    # [(название, статус, [(statement, parameters)], бюджет)]
+    results = []
+    for name, method, path, budget in CASES:
+        capture.take()
+        response = await client.request(method, path.format(**params))
+        results.append((name, response.status_code, capture.take(), budget))
+
+    capture.take()
+    response = await client.post("/appointments", json={
+        "user_id": specialist_id,
+        "client_id": client_id,
+        "date_of_appointment": f"{params['day']}T18:00:00",
+        "price": 9000,
+        "duration": 60,
+    })
+    results.append(("create_appointment", response.status_code, capture.take(), WRITE_BUDGETS["create_appointment"]))
+    if response.status_code < 400:
+        appointment_id = response.json()["id"]
+        response = await client.put(f"/appointments/{appointment_id}/finish")
+        results.append(("finish_appointment", response.status_code, capture.take(), WRITE_BUDGETS["finish_appointment"]))
+        response = await client.delete(f"/appointments/{appointment_id}")
+        results.append(("delete_appointment", response.status_code, capture.take(), WRITE_BUDGETS["delete_appointment"]))
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today() - timedelta(days=7),
+                        help="день, по которому строятся запросы (должен быть заполнен)")
+    parser.add_argument("--tables", default="appointments", help="таблицы, где Seq Scan запрещён")
+    parser.add_argument("--max-seq-rows", type=int, default=10_000)
+    parser.add_argument("--verbose", action="store_true", help="печатать запросы и планы")
+    args = parser.parse_args()
+
+    tables = set(args.tables.split(","))
+    month_start = args.date.replace(day=1)
+    params = {
+        "day": args.date.isoformat(),
+        "month_start": month_start.isoformat(),
+        "month_end": ((month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)).isoformat(),
+        "since": encode_cursor(datetime.now() - timedelta(hours=1), 0),
+    }
+
+    capture = Capture()
+    for db_engine in (engine, replica_engine):
+        if db_engine is not None:
+            event.listen(db_engine.sync_engine, "before_cursor_execute", capture)
+
+    explain_conn = await asyncpg.connect(ASYNCPG_DSN)
+    specialist_id, client_id = await explain_conn.fetchrow(
+        "SELECT (SELECT id FROM users WHERE email = 'bench-baitursynov-0@example.com'),"
+        " (SELECT min(id) FROM clients)"
+    )
+    table_rows = {
+        row["relname"]: row["reltuples"]
+        for row in await explain_conn.fetch(
+            "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relname = ANY($1::text[])", list(tables)
+        )
+    }
+    failures = []
+    plans_checked = 0
+    try:
+        for role, email in ROLES.items():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+                response = await client.post("/login", data={"username": email, "password": args.password})
+                if response.status_code != 200:
+                    raise SystemExit(f"login as {email} failed: {response.status_code}, run benchmarks.seed first")
+
+                for name, status_code, statements, budget in await run_requests(
+                    client, capture, params, specialist_id, client_id
+                ):
+                    label = f"{role}:{name}"
+                    print(f"{label:<42} {status_code}  {len(statements)} queries (budget {budget})")
+                    if len(statements) > budget:
+                        failures.append(f"{label}: {len(statements)} queries, budget {budget}")
+
+                    for statement, parameters in statements:
+                        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+                            continue
+                        plan = json.loads(await explain_conn.fetchval(f"EXPLAIN (FORMAT JSON) {statement}", *parameters))
+                        plans_checked += 1
+                        for problem in seq_scans(plan[0]["Plan"], table_rows, args.max_seq_rows):
+                            failures.append(f"{label}: {problem}\n    {' '.join(statement.split())}")
+                        if args.verbose:
+                            print("   ", " ".join(statement.split()))
+                            print("   ", json.dumps(plan[0]["Plan"], ensure_ascii=False)[:500])
+    finally:
+        await explain_conn.close()
+        await engine.dispose()
+        if replica_engine is not None:
+            await replica_engine.dispose()
+
+    print(f"\n{plans_checked} plans checked")
+    if failures:
+        print("FAILED:")
+        for failure in failures:
+            print(" ", failure)
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,226 @@
+"""Нагрузочный тест настоящих эндпоинтов запущенного бэкенда.
+
+Гоняет сценарии (вход, день в календаре, таймслот, зарплаты, создание/завершение/удаление записи)
+с заданной параллельностью и печатает p50/p95/p99 и пропускную способность.
+Результат пишется в JSON рядом с хэшем коммита, чтобы сравнивать прогоны между версиями.
+
+    cd backend
+    python -m benchmarks.seed --truncate            # данные, один раз
+    uvicorn src.app:app --workers 2                 # в другом терминале
+    python -m benchmarks.load_test --concurrency 20 --requests 500
+    python -m benchmarks.load_test --compare benchmarks/results/<старый>.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+from .seed import DIRECTOR_EMAIL
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# create сразу завершает и удаляет созданную запись — в отчёте это create, finish и delete
+SCENARIOS = ("login", "day_view", "timeslot", "salaries", "create")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def add(self, elapsed: float, status_code: int | None):
+        self.latencies.append(elapsed)
+        self.statuses[str(status_code)] += 1
+        if status_code is None or status_code >= 400:
+            self.errors += 1
+
+    def summary(self, wall: float) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "throughput_rps": round(len(ordered) / wall, 1) if wall else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        }
+
+
+async def timed(recorder: Recorder, request) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        recorder.add(time.perf_counter() - started, None)
+        return None
+    recorder.add(time.perf_counter() - started, response.status_code)
+    return response
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> httpx.Response:
+    return await client.post("/login", data={"username": username, "password": password})
+
+
+async def run_scenario(name: str, args, clients: list[httpx.AsyncClient], context: dict) -> dict:
+    keys = ("create", "finish", "delete") if name == "create" else (name,)
+    recorders = {key: Recorder() for key in keys}
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+
+    def random_day() -> date:
+        return args.date_from + timedelta(days=random.randint(0, (args.date_to - args.date_from).days))
+
+    async def worker(client: httpx.AsyncClient):
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if name == "login":
+                # отдельный клиент, чтобы не перезаписывать куки рабочей сессии
+                async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as fresh:
+                    await timed(recorders[name], login(fresh, args.username, args.password))
+            elif name == "day_view":
+                await timed(recorders[name], client.get(f"/appointments_by_date/{random_day().isoformat()}"))
+            elif name == "timeslot":
+                slot = f"{random.randint(9, 20):02d}:{random.choice((0, 15, 30, 45)):02d}"
+                await timed(recorders[name], client.get(f"/appointments_by_timeslot/{random_day().isoformat()}/{slot}"))
+            elif name == "salaries":
+                start = random_day().replace(day=1)
+                end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+                await timed(recorders[name], client.get(
+                    "/salaries", params={"start_date": start.isoformat(), "end_date": end.isoformat()}
+                ))
+            elif name == "create":
+                # запись создаётся, завершается и удаляется — база после прогона та же
+                moment = datetime.combine(random_day(), datetime.min.time()) + timedelta(hours=random.randint(9, 20))
+                created = await timed(recorders["create"], client.post("/appointments", json={
+                    "user_id": random.choice(context["specialists"]),
+                    "client_id": random.choice(context["clients"]),
+                    "date_of_appointment": moment.isoformat(),
+                    "price": 9000,
+                    "duration": 60,
+                    "type_of_massage": "load-test",
+                }))
+                if created is None or created.status_code >= 400:
+                    continue
+                appointment_id = created.json()["id"]
+                await timed(recorders["finish"], client.put(f"/appointments/{appointment_id}/finish"))
+                await timed(recorders["delete"], client.delete(f"/appointments/{appointment_id}"))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(clients[i % len(clients)]) for i in range(args.concurrency)))
+    wall = time.perf_counter() - started
+    return {key: recorder.summary(wall) for key, recorder in recorders.items()}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old: dict, new: dict):
+    print(f"{'scenario':<10} {'p50':>18} {'p95':>18} {'p99':>18} {'rps':>18}")
+    for name, result in new["results"].items():
+        before = old["results"].get(name)
+        if before is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            a, b = before[key], result[key]
+            change = f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+            cells.append(f"{a:>7}->{b:<7}{change:>4}")
+        print(f"{name:<10} " + " ".join(cells))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default=DIRECTOR_EMAIL)
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=300, help="запросов на сценарий")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"через запятую из: {', '.join(SCENARIOS)}")
+    parser.add_argument("--date-from", type=date.fromisoformat, default=date.today() - timedelta(days=90))
+    parser.add_argument("--date-to", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--sessions", type=int, default=4, help="сколько залогиненных клиентов делят воркеры")
+    parser.add_argument("--out", type=Path, help="куда сохранить JSON (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", type=Path, help="предыдущий JSON для сравнения")
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    clients = [
+        httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout,
+                          limits=httpx.Limits(max_connections=args.concurrency))
+        for _ in range(max(1, args.sessions))
+    ]
+    try:
+        for client in clients:
+            response = await login(client, args.username, args.password)
+            response.raise_for_status()
+
+        specialists = (await clients[0].get("/specialists")).json()
+        page = (await clients[0].get("/clients", params={"limit": 500})).json()
+        context = {
+            "specialists": [s["id"] for s in specialists],
+            "clients": [c["id"] for c in page["items"]],
+        }
+
+        results = {}
+        for name in args.scenarios.split(","):
+            print(f"running {name}...", flush=True)
+            results.update(await run_scenario(name, args, clients, context))
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "date_from": args.date_from.isoformat(),
+            "date_to": args.date_to.isoformat(),
+        },
+        "results": results,
+    }
+
+    for name, result in results.items():
+        print(f"{name:<10} p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms  "
+              f"p99 {result['p99_ms']:>8} ms  {result['throughput_rps']:>7} rps  errors {result['errors']}")
+
+    out = args.out or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit'] or 'nogit'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"saved {out}")
+
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
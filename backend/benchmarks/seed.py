@@ -0,0 +1,209 @@
+"""Синтетические данные для нагрузочных тестов.
+
+Заполняет локальную базу пользователями (директор, админы и специалисты обоих филиалов),
+ставками, расходами, клиентами и записями за выбранный период. Записи распределены
+по дням недели и часам примерно как в живом журнале: вечером и в будни плотнее,
+прошедшие в основном завершены. Большие таблицы грузятся через COPY,
+daily_revenue пересчитывается в конце.
+
+    cd backend
+    alembic upgrade head
+    python -m benchmarks.seed --appointments 2000000 --clients 100000 --truncate
+
+Все пользователи получают пароль --password; директор — bench-director@example.com.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+import asyncpg
+
+from src.config import ASYNCPG_DSN
+from src.passwords import pwd_context
+
+
+DIRECTOR_EMAIL = "bench-director@example.com"
+
+# часы работы и относительная загрузка по часам: утро спокойнее, пик после работы
+HOUR_WEIGHTS = {9: 3, 10: 5, 11: 6, 12: 6, 13: 5, 14: 5, 15: 6, 16: 7, 17: 9, 18: 10, 19: 9, 20: 5}
+# понедельник .. воскресенье
+WEEKDAY_WEIGHTS = (10, 9, 9, 10, 11, 8, 4)
+# доля специалистов (и, значит, записей) по филиалам
+BRANCH_WEIGHTS = {"baitursynov": 6, "gagarina": 4}
+
+MASSAGES = ["классический", "спортивный", "лимфодренажный", "антицеллюлитный", "шейно-воротниковая зона", "спина"]
+PAYMENTS = ["наличные", "карта", "перевод", "абонемент"]
+DURATIONS = [30, 45, 60, 60, 60, 90]
+PRICE_PER_MINUTE = 150
+DISCOUNTS = [0] * 8 + [5, 10]
+COURSES = [None] * 7 + ["5 сеансов", "10 сеансов"]
+
+F_NAMES = ["Алия", "Айгерим", "Дана", "Жанна", "Мадина", "Асель", "Ержан", "Нурлан", "Данияр", "Арман", "Ольга", "Ирина"]
+L_NAMES = ["Ахметова", "Садыкова", "Иванова", "Ким", "Нурланова", "Омарова", "Сериков", "Жумабаев", "Петров", "Ли"]
+M_NAMES = [None, "Сериковна", "Ержановна", "Викторовна", "Нурланович", "Асканович"]
+
+EXPENSES = ["аренда", "масла и кремы", "полотенца", "коммунальные услуги", "реклама", "уборка"]
+
+
+def users_rows(specialists_per_branch: int, password_hash: str) -> list[tuple]:
+    rows = [(DIRECTOR_EMAIL, password_hash, True, False, "Директор", "Бенч", None, True, True, "director")]
+    total = specialists_per_branch * len(BRANCH_WEIGHTS)
+    for branch, weight in BRANCH_WEIGHTS.items():
+        flags = (branch == "baitursynov", branch == "gagarina")
+        rows.append((f"bench-admin-{branch}@example.com", password_hash, False, True,
+                     "Админ", branch, None, *flags, "admin"))
+        count = max(1, round(total * weight / sum(BRANCH_WEIGHTS.values())))
+        for n in range(count):
+            rows.append((f"bench-{branch}-{n}@example.com", password_hash, False, False,
+                         random.choice(F_NAMES), random.choice(L_NAMES), random.choice(M_NAMES),
+                         *flags, "массажист"))
+    return rows
+
+
+def client_rows(count: int):
+    for n in range(count):
+        yield (
+            random.choice(F_NAMES),
+            random.choice(L_NAMES),
+            random.choice(M_NAMES),
+            f"+7 (7{random.randint(0, 99):02d}) {n // 10000 % 1000:03d}-{n // 100 % 100:02d}-{n % 100:02d}",
+            f"client{n}@example.com" if random.random() < 0.6 else None,
+            random.randint(0, 30),
+        )
+
+
+def appointment_rows(count: int, specialists: list[int], clients: list[int], days: list[date], today: date):
+    hours = list(HOUR_WEIGHTS)
+    hour_weights = list(accumulate(HOUR_WEIGHTS.values()))
+    day_weights = list(accumulate(WEEKDAY_WEIGHTS[d.weekday()] for d in days))
+
+    for _ in range(count):
+        day = random.choices(days, cum_weights=day_weights)[0]
+        start = datetime.combine(day, datetime.min.time()) + timedelta(
+            hours=random.choices(hours, cum_weights=hour_weights)[0], minutes=random.choice((0, 15, 30, 45))
+        )
+        duration = random.choice(DURATIONS)
+        created = start - timedelta(days=random.randint(0, 14), minutes=random.randint(0, 600))
+        finished = day < today and random.random() < 0.92
+        yield (
+            created,
+            start,
+            finished,
+            duration * PRICE_PER_MINUTE,
+            random.choice(COURSES),
+            random.choice(DISCOUNTS),
+            random.choice(PAYMENTS),
+            random.choice(MASSAGES),
+            duration,
+            "массаж",
+            random.choice(specialists),
+            random.choice(clients),
+        )
+
+
+async def copy_chunks(conn, table: str, columns: list[str], rows, chunk: int = 50_000) -> int:
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            await conn.copy_records_to_table(table, records=batch, columns=columns)
+            total += len(batch)
+            batch.clear()
+            print(f"  {table}: {total}", flush=True)
+    if batch:
+        await conn.copy_records_to_table(table, records=batch, columns=columns)
+        total += len(batch)
+    return total
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dsn", default=ASYNCPG_DSN)
+    parser.add_argument("--appointments", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=50_000)
+    parser.add_argument("--specialists-per-branch", type=int, default=10)
+    parser.add_argument("--days-back", type=int, default=730, help="сколько дней истории до сегодня")
+    parser.add_argument("--days-ahead", type=int, default=30, help="сколько дней будущих записей")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы перед заполнением")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    today = date.today()
+    days = [today + timedelta(days=offset) for offset in range(-args.days_back, args.days_ahead + 1)]
+    started = time.perf_counter()
+
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        if args.truncate:
+            await conn.execute(
+                "TRUNCATE daily_revenue, appointment_tombstones, appointments, salaries, expenses, clients, users RESTART IDENTITY CASCADE"
+            )
+        elif await conn.fetchval("SELECT 1 FROM users WHERE email = $1", DIRECTOR_EMAIL):
+            raise SystemExit("bench data already present, run with --truncate")
+
+        # один хэш на всех — bcrypt на тысячах пользователей занял бы минуты
+        password_hash = pwd_context.hash(args.password)
+        user_ids = []
+        specialists = []
+        for row in users_rows(args.specialists_per_branch, password_hash):
+            user_id = await conn.fetchval(
+                """
+                INSERT INTO users (email, password_hash, is_superuser, is_admin, f_name, l_name, m_name,
+                                   baitursynov, gagarina, position)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10) RETURNING id
+                """,
+                *row,
+            )
+            user_ids.append(user_id)
+            if row[-1] == "массажист":
+                specialists.append(user_id)
+
+        await conn.executemany(
+            "INSERT INTO salaries (salary, percent, user_id) VALUES ($1, $2, $3)",
+            [(random.choice((150_000, 200_000, 250_000)), random.choice((30, 35, 40)), u) for u in user_ids],
+        )
+        await conn.executemany(
+            "INSERT INTO expenses (name, expense) VALUES ($1, $2)",
+            [(name, random.randint(20_000, 500_000)) for name in EXPENSES for _ in range(args.days_back // 30 + 1)],
+        )
+
+        print(f"users: {len(user_ids)}, specialists: {len(specialists)}")
+        await copy_chunks(
+            conn, "clients", ["f_name", "l_name", "m_name", "phone", "email", "visit"], client_rows(args.clients)
+        )
+        clients = [r["id"] for r in await conn.fetch("SELECT id FROM clients")]
+
+        await copy_chunks(
+            conn,
+            "appointments",
+            ["date_of_creation", "date_of_appointment", "is_finished", "price", "course", "discount",
+             "type_of_payment", "type_of_massage", "duration", "service", "user_id", "client_id"],
+            appointment_rows(args.appointments, specialists, clients, days, today),
+        )
+    finally:
+        await conn.close()
+
+    from src.db_init import async_session, engine
+    from src.rollups import rebuild_daily_revenue
+
+    async with async_session() as db:
+        await rebuild_daily_revenue(db)
+    await engine.dispose()
+
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        await conn.execute("ANALYZE")
+    finally:
+        await conn.close()
+
+    print(f"done in {time.perf_counter() - started:.1f}s; login: {DIRECTOR_EMAIL} / {args.password}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,26 +1,122 @@
-from datetime import timedelta, date, datetime
+from contextlib import asynccontextmanager
+from datetime import timedelta, date, datetime, time
 
-from fastapi import FastAPI, HTTPException, Depends, status, Form, Request, Body, APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, status, Form, Request, Body, APIRouter, Query, WebSocket, WebSocketDisconnect, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select, func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import select, insert, update, delete, func, tuple_, or_, and_, case, literal_column, extract, cast, inspect, values, column, String, Date, DateTime
 from authx import AuthX, AuthXConfig, TokenPayload
 from authx.exceptions import JWTDecodeError
-from passlib.context import CryptContext
-from typing import Dict, List
+from pydantic import ValidationError
 import json
 import asyncio
+import base64
+import re
+import zipfile
+
+from . import models, schema, client_import
+from .models import BRANCHES
+from .db_init import (
+    engine, replica_engine, get_db, get_read_db, read_sessionmaker, warm_pool, db_pool_stats, READ_PRIMARY_COOKIE,
+)
+from .config import (
+    JWT_SECRET_KEY, USER_CACHE_TTL, AUTH_TRUST_TOKEN_CLAIMS,
+    ASYNCPG_DSN, DATABASE_REPLICA_URL, SPECIALISTS_CACHE_TTL, READ_YOUR_WRITES_SECONDS, DB_POOL_WARM, WS_BACKPLANE, WS_BACKPLANE_CHANNEL, REFERENCE_ETAGS, STATISTICS_CACHE_TTL, OCCUPANCY_CACHE_TTL,
+    FREE_SLOTS_CACHE_TTL, WORKDAY_START, WORKDAY_END, DEFAULT_APPOINTMENT_DURATION,
+    CHANGES_LAG_SECONDS, CHANGES_RETENTION_DAYS,
+    BULK_APPOINTMENTS_LIMIT, CLIENT_IMPORT_BATCH, CLIENT_IMPORT_MAX_ERRORS, METRICS_TOKEN,
+)
+from .cache import TTLCache
+from .passwords import hash_password, verify_and_update_password, pool_stats
+from .websocket_manager import ConnectionManager
+from .backplane import PostgresBackplane
+from .etags import TableVersions, REFERENCE_ROUTES
+from .rollups import revenue_from_returning
+from .slots import free_starts
+from .exports import export_response, stream_rows, rows_from, period_suffix
+from . import metrics
+from .reads import (
+    select_appointment_reads, appointment_dicts, json_response,
+    appointment_adapter, appointment_list_adapter, appointment_page_adapter, appointment_changes_adapter,
+)
+
+
+websocket_manager = ConnectionManager()
+table_versions = TableVersions()
+websocket_manager.listeners.append(
+    lambda message: table_versions.bump(message["table"]) if message.get("type") == "table_changed" else None
+)
+
+
+async def table_changed(table: str):
+    await websocket_manager.broadcast({"type": "table_changed", "table": table, "internal": True})
+
 
-from . import models, schema
-from .db_init import get_db
-from .config import JWT_SECRET_KEY
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_POOL_WARM > 0:
+        await warm_pool(DB_POOL_WARM)
+    backplane = None
+    if WS_BACKPLANE:
+        backplane = PostgresBackplane(ASYNCPG_DSN, WS_BACKPLANE_CHANNEL, websocket_manager.broadcast_local)
+        await backplane.start()
+        websocket_manager.backplane = backplane
+    yield
+    if backplane is not None:
+        websocket_manager.backplane = None
+        await backplane.stop()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    # после своей записи клиент какое-то время читает из основной базы — реплика может отставать
+    response = await call_next(request)
+    if DATABASE_REPLICA_URL and request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, "1", max_age=READ_YOUR_WRITES_SECONDS, httponly=True, samesite="lax"
+        )
+    return response
+
+
+for db_engine in (engine, replica_engine):
+    if db_engine is not None:
+        metrics.instrument_engine(db_engine)
+
+async def conditional_get(request: Request, call_next):
+    # справочники: если версия таблицы не менялась, отвечаем 304, не доходя до запроса в базу
+    tables = REFERENCE_ROUTES.get(request.url.path)
+    if request.method != "GET" or tables is None:
+        return await call_next(request)
+
+    # версию берём до выполнения запроса: если запись успеет пройти параллельно, ETag просто устареет
+    etag = table_versions.etag(request, tables)
+    if request.headers.get("If-None-Match") == etag:
+        try:
+            await authx_security._auth_required(request=request)
+        except Exception:
+            return await call_next(request)
+        table_versions.not_modified += 1
+        # до роутинга не дошли — метрики иначе записали бы ответ в route="unmatched"
+        request.scope["route_path"] = request.url.path
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# без общей рассылки table_changed другой воркер не узнает о записи и отвечал бы 304 на устаревшие данные
+if REFERENCE_ETAGS:
+    app.middleware("http")(conditional_get)
+app.middleware("http")(metrics.metrics_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -32,36 +128,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # имя файла выгрузки фронтенд берёт из Content-Disposition
+    expose_headers=["Content-Disposition"],
 )
 
 
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                disconnected.append(connection)
-        
-        
-        for connection in disconnected:
-            self.disconnect(connection)
-
+def handle_ws_message(websocket: WebSocket, data: str):
+    # {"type": "subscribe", "branch": "all|baitursynov|gagarina", "date_from": "YYYY-MM-DD", "date_to": "YYYY-MM-DD"}
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return
+    if not isinstance(message, dict) or message.get("type") != "subscribe":
+        return
 
-websocket_manager = ConnectionManager()
+    branch = message.get("branch") or "all"
+    if branch != "all" and branch not in BRANCHES:
+        return
+    try:
+        date_from = date.fromisoformat(message["date_from"])
+        date_to = date.fromisoformat(message.get("date_to") or message["date_from"])
+    except (KeyError, TypeError, ValueError):
+        return
+    websocket_manager.subscribe(websocket, branch, date_from, date_to)
 
 
 @app.websocket("/ws")
@@ -71,8 +161,11 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             
             data = await websocket.receive_text()
+            handle_ws_message(websocket, data)
             
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
         websocket_manager.disconnect(websocket)
 
 
@@ -87,11 +180,63 @@ authx_cfg.JWT_COOKIE_HTTP_ONLY = True
 authx_cfg.JWT_COOKIE_CSRF_PROTECT = False  
 
 authx_security = AuthX(config=authx_cfg)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 
 
+def day_bounds(start: date, end: date | None = None):
+    # полуоткрытый интервал [start, end + 1 день), чтобы работал индекс по date_of_appointment
+    end = end or start
+    return (
+        datetime.combine(start, datetime.min.time()),
+        datetime.combine(end + timedelta(days=1), datetime.min.time()),
+    )
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def scope_appointments(q, role: str, user: models.Users, branch: str | None = None, users_joined: bool = False,
+                       user_column=models.Appointments.user_id):
+    # ограничение выборки записей по роли и (опционально) по филиалу специалиста;
+    # user_column — колонка со специалистом, если выбираем не из appointments (например, из tombstones)
+    if not users_joined and (branch in BRANCHES or role == "admin"):
+        q = q.join(models.Users, user_column == models.Users.id)
+
+    if branch == "baitursynov":
+        q = q.where(models.Users.baitursynov == True)
+    elif branch == "gagarina":
+        q = q.where(models.Users.gagarina == True)
+
+    if role == "admin":
+        q = q.where(
+            (models.Users.baitursynov == user.baitursynov)
+            | (models.Users.gagarina == user.gagarina)
+        )
+    elif role != "director":
+        q = q.where(user_column == user.id)
+    return q
+
+
+def specialist_branches(baitursynov: bool | None, gagarina: bool | None) -> list[str]:
+    # специалист может работать в обоих филиалах — событие уходит подписчикам каждого;
+    # без филиала — всем, как раньше с "all"
+    branches = [branch for branch, flag in zip(BRANCHES, (baitursynov, gagarina)) if flag]
+    return branches or list(BRANCHES)
+
+
 def get_role_and_branch(user: models.Users):
     if user.is_superuser:   
         return "director", None
@@ -103,6 +248,31 @@ def get_role_and_branch(user: models.Users):
         return "employee", branch
 
 
+user_cache = TTLCache(ttl=USER_CACHE_TTL)
+
+
+def user_from_claims(user_id: int, role: str, branch: str | None):
+    # пользователь без похода в БД: флаги восстанавливаются из role/branch токена, email неизвестен
+    user = models.Users(
+        id=user_id,
+        is_superuser=role == "director",
+        is_admin=role == "admin",
+        baitursynov=branch == "baitursynov",
+        gagarina=branch == "gagarina",
+    )
+    return {"user": user, "role": role, "branch": branch}
+
+
+def cached_user_copy(user: models.Users) -> models.Users:
+    # в кэш кладём копию вне сессии: сам объект принадлежит сессии запроса и после её rollback
+    # протухает — следующий запрос из кэша падал бы на DetachedInstanceError
+    return models.Users(**{
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(models.Users).column_attrs
+        if attr.key != "password_hash"
+    })
+
+
 async def get_current_user_data(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         token: TokenPayload = await authx_security._auth_required(request=request)
@@ -110,6 +280,14 @@ async def get_current_user_data(request: Request, db: AsyncSession = Depends(get
         raise HTTPException(status_code=401, detail="Signature has expired")
 
     user_id = int(token.sub)
+
+    if AUTH_TRUST_TOKEN_CLAIMS and getattr(token, "role", None):
+        return user_from_claims(user_id, token.role, getattr(token, "branch", None))
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
+
     stmt = select(models.Users).where(models.Users.id == user_id)
     result = await db.execute(stmt)
     user = result.scalar_one_or_none()
@@ -117,7 +295,9 @@ async def get_current_user_data(request: Request, db: AsyncSession = Depends(get
         raise HTTPException(status_code=401, detail="User not found")
 
     role, branch = get_role_and_branch(user)
-    return {"user": user, "role": role, "branch": branch}
+    current = {"user": cached_user_copy(user), "role": role, "branch": branch}
+    user_cache.set(user_id, current)
+    return dict(current)
 
 
 async def require_user(current=Depends(get_current_user_data)):
@@ -140,9 +320,14 @@ async def login(
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
-    if not pwd_context.verify(password, user.password_hash):
+    valid, new_hash = await verify_and_update_password(password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
 
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
     role, branch = get_role_and_branch(user)
 
     access_token = authx_security.create_access_token(
@@ -203,7 +388,7 @@ async def create_user(
 ):
     new_user = models.Users(
         email=data.email,
-        password_hash=pwd_context.hash(data.password),
+        password_hash=await hash_password(data.password),
         f_name=data.f_name,
         l_name=data.l_name,
         m_name=data.m_name,
@@ -217,6 +402,8 @@ async def create_user(
     try:
         await db.commit()
         await db.refresh(new_user)
+        user_cache.invalidate(new_user.id)
+        await table_changed("users")
         return new_user
     except Exception as e:
         await db.rollback()
@@ -225,37 +412,183 @@ async def create_user(
 
 
 
-@app.get("/appointments", response_model=list[schema.AppointmentRead])
-async def get_appointments(current=Depends(get_current_user_data), db: AsyncSession = Depends(get_db)):
+def filter_appointments(
+    stmt,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    user_id: int | None = None,
+    client_id: int | None = None,
+    is_finished: bool | None = None,
+):
+    if date_from:
+        stmt = stmt.where(models.Appointments.date_of_appointment >= day_bounds(date_from)[0])
+    if date_to:
+        stmt = stmt.where(models.Appointments.date_of_appointment < day_bounds(date_to)[1])
+    if user_id is not None:
+        stmt = stmt.where(models.Appointments.user_id == user_id)
+    if client_id is not None:
+        stmt = stmt.where(models.Appointments.client_id == client_id)
+    if is_finished is True:
+        stmt = stmt.where(models.Appointments.is_finished.is_(True))
+    elif is_finished is False:
+        stmt = stmt.where(models.Appointments.is_finished.isnot(True))
+    return stmt
+
+
+@app.get("/appointments", response_model=schema.AppointmentPage)
+async def get_appointments(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="next_cursor из предыдущей страницы"),
+    date_from: date | None = Query(None, description="Дата начала периода (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, description="Дата конца периода (YYYY-MM-DD)"),
+    user_id: int | None = Query(None),
+    client_id: int | None = Query(None),
+    is_finished: bool | None = Query(None),
+    branch: str | None = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
+    current=Depends(get_current_user_data),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = scope_appointments(select_appointment_reads(), current["role"], current["user"], branch, users_joined=True)
+    stmt = filter_appointments(stmt, date_from, date_to, user_id, client_id, is_finished)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            after = (datetime.fromisoformat(values[0]), int(values[1]))
+        except (ValueError, TypeError, IndexError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(
+            tuple_(models.Appointments.date_of_appointment, models.Appointments.id) > after
+        )
+
+    stmt = stmt.order_by(models.Appointments.date_of_appointment, models.Appointments.id).limit(limit + 1)
+
+    result = await db.execute(stmt)
+    items = appointment_dicts(result)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last["date_of_appointment"], last["id"])
+    return json_response(appointment_page_adapter, {"items": items, "next_cursor": next_cursor})
+
+
+
+@app.get("/appointments/changes", response_model=schema.AppointmentChanges)
+async def get_appointment_changes(
+    since: str | None = Query(None, description="cursor из предыдущего ответа; без него — только текущий курсор"),
+    limit: int = Query(500, ge=1, le=2000),
+    branch: str | None = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
+    current=Depends(require_user),
+    # только primary: на реплике с отставанием горизонт опережал бы реально видимые строки
+    db: AsyncSession = Depends(get_db),
+):
+    # курсор — (updated_at, id) последней отданной строки. Изменения моложе CHANGES_LAG_SECONDS не отдаются,
+    # чтобы не перепрыгнуть через ещё не закоммиченную запись со временем раньше курсора.
+    # Клиент берёт курсор до полной загрузки, потом применяет changed/deleted по id (повторы безвредны)
     role = current["role"]
     user = current["user"]
 
-    if role == "director":
-        stmt = select(models.Appointments).options(
-            selectinload(models.Appointments.user),
-            selectinload(models.Appointments.clients)
-        )
-    elif role == "admin":
-        stmt = (
-            select(models.Appointments)
-            .join(models.Users)
-            .where(
-                (models.Users.baitursynov == user.baitursynov)
-                | (models.Users.gagarina == user.gagarina)
-            )
-            .options(
-                selectinload(models.Appointments.user),
-                selectinload(models.Appointments.clients)
-            )
+    horizon = await db.scalar(select(func.localtimestamp() - timedelta(seconds=CHANGES_LAG_SECONDS)))
+    if since is None:
+        return {"changed": [], "deleted": [], "cursor": encode_cursor(horizon, 0), "has_more": False}
+
+    values = decode_cursor(since)
+    try:
+        after = (datetime.fromisoformat(values[0]), int(values[1]))
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if after[0] < horizon - timedelta(days=CHANGES_RETENTION_DAYS):
+        raise HTTPException(status_code=410, detail="Cursor expired")
+
+    stmt = scope_appointments(
+        select_appointment_reads().add_columns(models.Appointments.updated_at),
+        role, user, branch, users_joined=True,
+    )
+    stmt = (
+        stmt.where(
+            tuple_(models.Appointments.updated_at, models.Appointments.id) > after,
+            models.Appointments.updated_at < horizon,
         )
+        .order_by(models.Appointments.updated_at, models.Appointments.id)
+        .limit(limit + 1)
+    )
+    rows = (await db.execute(stmt)).all()
+
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        upper = rows[-1].updated_at
+        cursor = encode_cursor(upper, rows[-1].id)
     else:
-        stmt = select(models.Appointments).where(models.Appointments.user_id == user.id).options(
-            selectinload(models.Appointments.user),
-            selectinload(models.Appointments.clients)
-        )
+        upper = horizon
+        cursor = encode_cursor(horizon, 0)
+
+    tombstones = models.AppointmentTombstones
+    q = select(
+        tombstones.appointment_id.label("id"),
+        tombstones.user_id,
+        tombstones.date_of_appointment,
+        tombstones.deleted_at,
+    ).where(tombstones.deleted_at >= after[0], tombstones.deleted_at < upper)
+    q = scope_appointments(q, role, user, branch, user_column=tombstones.user_id)
+    deleted = [dict(row) for row in (await db.execute(q.order_by(tombstones.deleted_at))).mappings()]
+
+    return json_response(appointment_changes_adapter, {
+        "changed": appointment_dicts(rows), "deleted": deleted, "cursor": cursor, "has_more": has_more,
+    })
 
-    result = await db.execute(stmt)
-    return result.scalars().all()
+
+APPOINTMENT_EXPORT_COLUMNS = (
+    "ID", "Дата", "Специалист", "Клиент", "Телефон", "Услуга", "Вид массажа",
+    "Длительность", "Курс", "Цена", "Скидка", "Оплата", "Завершена",
+)
+
+
+@app.get("/appointments/export")
+async def export_appointments(
+    request: Request,
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$"),
+    date_from: date | None = Query(None, description="Дата начала периода (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, description="Дата конца периода (YYYY-MM-DD)"),
+    user_id: int | None = Query(None),
+    client_id: int | None = Query(None),
+    is_finished: bool | None = Query(None),
+    branch: str | None = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
+    current=Depends(require_user),
+):
+    # только нужные колонки, без ORM-объектов — строки не копятся в identity map сессии
+    stmt = (
+        select(
+            models.Appointments.id,
+            models.Appointments.date_of_appointment,
+            func.concat_ws(" ", models.Users.l_name, models.Users.f_name),
+            func.concat_ws(" ", models.Clients.l_name, models.Clients.f_name, models.Clients.m_name),
+            models.Clients.phone,
+            models.Appointments.service,
+            models.Appointments.type_of_massage,
+            models.Appointments.duration,
+            models.Appointments.course,
+            models.Appointments.price,
+            models.Appointments.discount,
+            models.Appointments.type_of_payment,
+            models.Appointments.is_finished,
+        )
+        .join(models.Users, models.Appointments.user_id == models.Users.id)
+        .outerjoin(models.Clients, models.Appointments.client_id == models.Clients.id)
+    )
+    stmt = scope_appointments(stmt, current["role"], current["user"], branch, users_joined=True)
+    stmt = filter_appointments(stmt, date_from, date_to, user_id, client_id, is_finished)
+    stmt = stmt.order_by(models.Appointments.date_of_appointment, models.Appointments.id)
+
+    return export_response(
+        format,
+        "appointments",
+        APPOINTMENT_EXPORT_COLUMNS,
+        stream_rows(stmt, sessionmaker=read_sessionmaker(request)),
+        period_suffix(date_from, date_to),
+    )
 
 
 
@@ -263,76 +596,37 @@ async def get_appointments(current=Depends(get_current_user_data), db: AsyncSess
 async def get_appointments_by_date(
     date: date,
     branch: str = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_read_db),
     current=Depends(require_user),
 ):
-    role = current["role"]
-    user = current["user"]
+    day_start, day_end = day_bounds(date)
 
-    base_q = (
-        select(models.Appointments)
-        .where(func.date(models.Appointments.date_of_appointment) == date)
-        .options(
-            selectinload(models.Appointments.user),
-            selectinload(models.Appointments.clients)
-        )
+    q = select_appointment_reads().where(
+        models.Appointments.date_of_appointment >= day_start,
+        models.Appointments.date_of_appointment < day_end,
     )
-
-    if branch and branch in ['baitursynov', 'gagarina']:
-        if branch == 'baitursynov':
-            base_q = base_q.join(models.Users).where(models.Users.baitursynov == True)
-        else:
-            base_q = base_q.join(models.Users).where(models.Users.gagarina == True)
-
-    if role == "director":
-        q = base_q
-    elif role == "admin":
-        q = base_q.join(models.Users).where(
-            (models.Users.baitursynov == user.baitursynov)
-            | (models.Users.gagarina == user.gagarina)
-        )
-    else:
-        q = base_q.where(models.Appointments.user_id == user.id)
+    q = scope_appointments(q, current["role"], current["user"], branch, users_joined=True)
 
     res = await session.execute(q)
-    return res.scalars().all()
+    return json_response(appointment_list_adapter, appointment_dicts(res))
 
 
 
 @app.get("/appointments_by_datetime/{datetime_str}", response_model=list[schema.AppointmentRead])
 async def get_appointments_by_datetime(
     datetime_str: str,
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_read_db),
     current=Depends(require_user),
 ):
     try:
         from datetime import datetime
         target_datetime = datetime.fromisoformat(datetime_str.replace("Z", "+00:00"))
 
-        role = current["role"]
-        user = current["user"]
-
-        base_q = (
-            select(models.Appointments)
-            .where(models.Appointments.date_of_appointment == target_datetime)
-            .options(
-                selectinload(models.Appointments.user),
-                selectinload(models.Appointments.clients)
-            )
-        )
-
-        if role == "director":
-            q = base_q
-        elif role == "admin":
-            q = base_q.join(models.Users).where(
-                (models.Users.baitursynov == user.baitursynov)
-                | (models.Users.gagarina == user.gagarina)
-            )
-        else:
-            q = base_q.where(models.Appointments.user_id == user.id)
+        q = select_appointment_reads().where(models.Appointments.date_of_appointment == target_datetime)
+        q = scope_appointments(q, current["role"], current["user"], users_joined=True)
 
         res = await session.execute(q)
-        return res.scalars().all()
+        return json_response(appointment_list_adapter, appointment_dicts(res))
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid datetime format")
 
@@ -352,36 +646,37 @@ async def create_appointment(
 
         appointment_datetime = datetime.fromisoformat(data["date_of_appointment"])
 
-        new_appointment = models.Appointments(
-    date_of_creation=datetime.now(),
-    date_of_appointment=appointment_datetime,
-    user_id=int(data["user_id"]),
-    client_id=int(data["client_id"]),
-    price=data.get("price"),
-    course=data.get("course"),
-    discount=data.get("discount"),
-    type_of_payment=data.get("type_of_payment"),
-    type_of_massage=data.get("type_of_massage"),
-    duration=data.get("duration"),
-    service=data.get("service"),
-)
-
-        
-        db.add(new_appointment)
+        # INSERT ... RETURNING и join с users/clients одним запросом вместо commit + двух refresh
+        new_appointment = (
+            insert(models.Appointments)
+            .values(
+                date_of_creation=datetime.now(),
+                date_of_appointment=appointment_datetime,
+                user_id=int(data["user_id"]),
+                client_id=int(data["client_id"]),
+                price=data.get("price"),
+                course=data.get("course"),
+                discount=data.get("discount"),
+                type_of_payment=data.get("type_of_payment"),
+                type_of_massage=data.get("type_of_massage"),
+                duration=data.get("duration"),
+                service=data.get("service"),
+            )
+            .returning(*models.Appointments.__table__.c)
+            .cte("new_appointment")
+        )
+        result = await db.execute(select_appointment_reads(new_appointment))
+        appointment = appointment_dicts(result)[0]
         await db.commit()
-        await db.refresh(new_appointment)
 
-        
-        
         await websocket_manager.broadcast({
             "type": "appointment_created",
             "date": appointment_datetime.date().isoformat(),
-            "branch": "all",  
-            "appointment_id": new_appointment.id
+            "branches": specialist_branches(appointment["user"]["baitursynov"], appointment["user"]["gagarina"]),
+            "appointment_id": appointment["id"]
         })
 
-        await db.refresh(new_appointment, ["user", "clients"])
-        return new_appointment
+        return json_response(appointment_adapter, appointment)
 
     except ValueError as e:
         await db.rollback()
@@ -390,54 +685,240 @@ async def create_appointment(
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error creating appointment: {str(e)}")
 
+def expand_recurrence(template: schema.AppointmentBulkItem, recurrence: schema.AppointmentRecurrence):
+    step = timedelta(days=recurrence.interval * (7 if recurrence.frequency == "weekly" else 1))
+    return [
+        template.model_copy(update={"date_of_appointment": template.date_of_appointment + step * i})
+        for i in range(recurrence.count)
+    ]
+
+
+@app.post("/appointments/bulk", response_model=list[schema.AppointmentRead])
+async def create_appointments_bulk(
+    data: schema.AppointmentBulkCreate,
+    current=Depends(require_user),
+    db: AsyncSession = Depends(get_db),
+):
+    items = list(data.appointments)
+    if data.template is not None or data.recurrence is not None:
+        if data.template is None or data.recurrence is None:
+            raise HTTPException(status_code=400, detail="template and recurrence must be sent together")
+        items += expand_recurrence(data.template, data.recurrence)
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No appointments to create")
+    if len(items) > BULK_APPOINTMENTS_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Too many appointments, max {BULK_APPOINTMENTS_LIMIT}")
+
+    slots = {(item.user_id, item.date_of_appointment) for item in items}
+    if len(slots) != len(items):
+        raise HTTPException(status_code=400, detail="Duplicate specialist and time in request")
+
+    users = {
+        u.id: u for u in (await db.scalars(
+            select(models.Users).where(models.Users.id.in_({item.user_id for item in items}))
+        )).all()
+    }
+    clients = {
+        c.id: c for c in (await db.scalars(
+            select(models.Clients).where(models.Clients.id.in_({item.client_id for item in items}))
+        )).all()
+    }
+    missing_users = {item.user_id for item in items} - users.keys()
+    missing_clients = {item.client_id for item in items} - clients.keys()
+    if missing_users:
+        raise HTTPException(status_code=400, detail=f"Unknown user_id: {sorted(missing_users)}")
+    if missing_clients:
+        raise HTTPException(status_code=400, detail=f"Unknown client_id: {sorted(missing_clients)}")
+
+    busy = (await db.execute(
+        select(models.Appointments.user_id, models.Appointments.date_of_appointment).where(
+            tuple_(models.Appointments.user_id, models.Appointments.date_of_appointment).in_(list(slots))
+        )
+    )).all()
+    if busy:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Specialist already booked: {[(u, d.isoformat()) for u, d in busy]}",
+        )
+
+    now = datetime.now()
+    try:
+        # один INSERT ... VALUES (...), (...) RETURNING на всю пачку
+        result = await db.scalars(
+            insert(models.Appointments).returning(models.Appointments, sort_by_parameter_order=True),
+            [{**item.model_dump(), "date_of_creation": now} for item in items],
+        )
+        created = result.all()
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error creating appointments: {e}")
+
+    for appointment in created:
+        set_committed_value(appointment, "user", users[appointment.user_id])
+        set_committed_value(appointment, "clients", clients[appointment.client_id])
+
+    branches = set()
+    for appointment in created:
+        user = users[appointment.user_id]
+        branches.update(specialist_branches(user.baitursynov, user.gagarina))
+    await websocket_manager.broadcast({
+        "type": "appointments_created",
+        "dates": sorted({a.date_of_appointment.date().isoformat() for a in created}),
+        "branches": sorted(branches),
+        "appointment_ids": [a.id for a in created],
+    })
+
+    return created
+
+
 @app.delete("/appointments/{appointment_id}")
 async def delete_appointment(
     appointment_id: int,
     current=Depends(require_user),
     db: AsyncSession = Depends(get_db),
 ):
-    try:
-        result = await db.execute(
-            select(models.Appointments).where(models.Appointments.id == appointment_id)
+    # DELETE ... RETURNING, вычитание из daily_revenue и филиал специалиста — один запрос
+    deleted = (
+        delete(models.Appointments)
+        .where(models.Appointments.id == appointment_id)
+        .returning(
+            models.Appointments.id,
+            models.Appointments.user_id,
+            models.Appointments.date_of_appointment,
+            models.Appointments.is_finished,
+            models.Appointments.price,
+            models.Appointments.discount,
         )
-        appointment = result.scalar_one_or_none()
-
-        if appointment:
-            
-            appointment_date = appointment.date_of_appointment.date()
-            
-            await db.delete(appointment)
-            await db.commit()
-            
-            
-            await websocket_manager.broadcast({
-                "type": "appointment_deleted",
-                "date": appointment_date.isoformat(),
-                "branch": "all",
-                "appointment_id": appointment_id
-            })
-            
-            return {"message": "Appointment deleted successfully"}
-        else:
-            raise HTTPException(status_code=404, detail="Appointment not found")
+        .cte("deleted")
+    )
+    # tombstone для GET /appointments/changes, заодно чистим устаревшие
+    tombstone = (
+        insert(models.AppointmentTombstones)
+        .from_select(
+            ["appointment_id", "user_id", "date_of_appointment"],
+            select(deleted.c.id, deleted.c.user_id, deleted.c.date_of_appointment),
+        )
+        .returning(models.AppointmentTombstones.appointment_id)
+        .cte("tombstone")
+    )
+    expired = (
+        delete(models.AppointmentTombstones)
+        .where(models.AppointmentTombstones.deleted_at < func.localtimestamp() - timedelta(days=CHANGES_RETENTION_DAYS))
+        .returning(models.AppointmentTombstones.appointment_id)
+        .cte("expired_tombstones")
+    )
+    stmt = (
+        select(deleted.c.date_of_appointment, models.Users.baitursynov, models.Users.gagarina)
+        .join_from(deleted, models.Users, deleted.c.user_id == models.Users.id)
+        .add_cte(revenue_from_returning(deleted, -1, finished_only=True), tombstone, expired)
+    )
+    try:
+        row = (await db.execute(stmt)).first()
+        await db.commit()
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting appointment: {e}")
 
+    if row is None:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+
+    await websocket_manager.broadcast({
+        "type": "appointment_deleted",
+        "date": row.date_of_appointment.date().isoformat(),
+        "branches": specialist_branches(row.baitursynov, row.gagarina),
+        "appointment_id": appointment_id
+    })
+
+    return {"message": "Appointment deleted successfully"}
 
 
+USER_READ_COLUMNS = [getattr(models.Users, name) for name in schema.UserRead.model_fields]
 
-@app.get("/users")
+
+@app.get("/users", response_model=list[schema.UserRead])
 async def get_users(current=Depends(require_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Users))
-    return result.scalars().all()
+    # только колонки UserRead — password_hash наружу не уходит
+    result = await db.execute(select(*USER_READ_COLUMNS).order_by(models.Users.id))
+    return result.mappings().all()
 
 
-@app.get("/clients")
-async def get_clients(current=Depends(require_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Clients))
+@app.get("/clients", response_model=schema.ClientPage)
+async def get_clients(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="next_cursor из предыдущей страницы"),
+    current=Depends(require_user),
+    db: AsyncSession = Depends(get_db),
+):
+    stmt = select(models.Clients)
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            after_id = int(values[0])
+        except (ValueError, TypeError, IndexError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(models.Clients.id > after_id)
+
+    result = await db.execute(stmt.order_by(models.Clients.id).limit(limit + 1))
     clients = result.scalars().all()
-    return clients
+
+    next_cursor = None
+    if len(clients) > limit:
+        clients = clients[:limit]
+        next_cursor = encode_cursor(clients[-1].id)
+    return {"items": clients, "next_cursor": next_cursor}
+
+
+def like_pattern(value: str, prefix_only: bool = False) -> str:
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix_only else f"%{escaped}%"
+
+
+@app.get("/clients/search", response_model=list[schema.ClientRead])
+async def search_clients(
+    q: str = Query(..., min_length=1, description="Имя, фамилия или цифры телефона"),
+    limit: int = Query(20, ge=1, le=100),
+    current=Depends(require_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # литералы вместо параметров, чтобы выражение совпало с индексом ix_clients_phone_digits_trgm
+    phone_digits = func.regexp_replace(
+        models.Clients.phone, literal_column(r"'\D'"), literal_column("''"), literal_column("'g'")
+    )
+
+    tokens = q.split()
+    if not tokens:
+        return []
+
+    conditions = []
+    for token in tokens:
+        token_conditions = [
+            models.Clients.f_name.ilike(like_pattern(token), escape="\\"),
+            models.Clients.l_name.ilike(like_pattern(token), escape="\\"),
+        ]
+        if re.fullmatch(r"[\d()+\-]+", token):
+            # токен из одних "+()-" даёт пустые цифры — LIKE '%%' совпал бы с каждым телефоном
+            for digits in sorted(client_import.phone_variants(token)):
+                token_conditions.append(phone_digits.like(like_pattern(digits)))
+        conditions.append(or_(*token_conditions))
+
+    first = tokens[0]
+    # совпадения с начала фамилии/имени выше остальных
+    rank = case(
+        (models.Clients.l_name.ilike(like_pattern(first, prefix_only=True), escape="\\"), 0),
+        (models.Clients.f_name.ilike(like_pattern(first, prefix_only=True), escape="\\"), 1),
+        else_=2,
+    )
+
+    stmt = (
+        select(models.Clients)
+        .where(and_(*conditions))
+        .order_by(rank, models.Clients.l_name, models.Clients.f_name, models.Clients.id)
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return result.scalars().all()
 
 
 @app.get("/services")
@@ -445,59 +926,283 @@ async def get_services():
     return {'здесь пока нихера нет'}
 
 
-@app.get("/specialists")
-async def get_specialists(current=Depends(require_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(models.Users))
-    users = result.scalars().all()
-    return [user for user in users if not user.is_superuser and not user.is_admin]
+specialists_cache = TTLCache(ttl=SPECIALISTS_CACHE_TTL)
+websocket_manager.listeners.append(
+    lambda message: specialists_cache.clear()
+    if message.get("type") == "table_changed" and message.get("table") == "users" else None
+)
+
+
+async def load_specialists(db: AsyncSession, branch: str | None) -> list[dict]:
+    key = branch if branch in BRANCHES else None
+    cached = specialists_cache.get(key)
+    if cached is not None:
+        return cached
+
+    stmt = (
+        select(*(getattr(models.Users, name) for name in schema.SpecialistRead.model_fields))
+        .where(models.Users.is_superuser.isnot(True), models.Users.is_admin.isnot(True))
+        .order_by(models.Users.id)
+    )
+    if key == "baitursynov":
+        stmt = stmt.where(models.Users.baitursynov == True)
+    elif key == "gagarina":
+        stmt = stmt.where(models.Users.gagarina == True)
+
+    result = await db.execute(stmt)
+    specialists = [dict(row) for row in result.mappings()]
+    specialists_cache.set(key, specialists)
+    return specialists
+
+
+@app.get("/specialists", response_model=list[schema.SpecialistRead])
+async def get_specialists(
+    branch: str | None = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
+    current=Depends(require_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await load_specialists(db, branch)
 
 
 @app.get("/appointments_by_timeslot/{date}/{time}", response_model=list[schema.AppointmentRead])
 async def get_appointments_by_timeslot(
     date: date,
     time: str,
-    session: AsyncSession = Depends(get_db),
+    session: AsyncSession = Depends(get_read_db),
     current=Depends(require_user),
 ):
     try:
         from datetime import datetime, timedelta
         hour, minute = map(int, time.split(":"))
         start_time = datetime.combine(date, datetime.min.time()) + timedelta(hours=hour, minutes=minute)
-        end_time = start_time + timedelta(minutes=14, seconds=59)
-
-        role = current["role"]
-        user = current["user"]
+        end_time = start_time + timedelta(minutes=15)
 
-        base_q = (
-            select(models.Appointments)
-            .where(
-                models.Appointments.date_of_appointment >= start_time,
-                models.Appointments.date_of_appointment <= end_time,
-            )
-            .options(
-                selectinload(models.Appointments.user),
-                selectinload(models.Appointments.clients)
-            )
+        q = select_appointment_reads().where(
+            models.Appointments.date_of_appointment >= start_time,
+            models.Appointments.date_of_appointment < end_time,
         )
-
-        if role == "director":
-            q = base_q
-        elif role == "admin":
-            q = base_q.join(models.Users).where(
-                (models.Users.baitursynov == user.baitursynov)
-                | (models.Users.gagarina == user.gagarina)
-            )
-        else:
-            q = base_q.where(models.Appointments.user_id == user.id)
+        q = scope_appointments(q, current["role"], current["user"], users_joined=True)
 
         res = await session.execute(q)
-        return res.scalars().all()
+        return json_response(appointment_list_adapter, appointment_dicts(res))
 
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid time format")
 
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    pool = db_pool_stats()
+    ws = websocket_manager.stats()
+    gauges = {
+        "crm_db_pool_size": pool["size"],
+        "crm_db_pool_checked_out": pool["checked_out"],
+        "crm_db_pool_overflow": pool["overflow"],
+        "crm_db_pool_checkouts": pool["checkouts"],
+        "crm_db_pool_timeouts": pool["timeouts"],
+        "crm_db_pool_wait_max_seconds": pool["wait_max_ms"] / 1000,
+        "crm_websocket_connections": ws["connections"],
+        "crm_websocket_dropped_messages": ws["dropped_messages"],
+    }
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/runtime_stats")
+async def get_runtime_stats(current=Depends(require_user)):
+    if current["role"] != "director":
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return {
+        "db_pool": db_pool_stats(),
+        "reference_etags": table_versions.stats() if REFERENCE_ETAGS else None,
+        "specialists": specialists_cache.stats(),
+        "users": user_cache.stats(),
+        "password_hashing": pool_stats(),
+        "websocket": websocket_manager.stats(),
+        "statistics": statistics_cache.stats(),
+        "occupancy": occupancy_cache.stats(),
+        "free_slots": free_slots_cache.stats(),
+    }
+
+
+SLOT_MINUTES = 15
+
+occupancy_cache = TTLCache(ttl=OCCUPANCY_CACHE_TTL)
+websocket_manager.listeners.append(
+    lambda message: occupancy_cache.clear() if message.get("type") != "table_changed" else None
+)
+
+
+@app.get("/occupancy")
+async def get_occupancy(
+    date_from: date | None = Query(None, description="Дата начала (YYYY-MM-DD), по умолчанию начало месяца"),
+    date_to: date | None = Query(None, description="Дата конца (YYYY-MM-DD), по умолчанию конец месяца"),
+    branch: str | None = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
+    session: AsyncSession = Depends(get_db),
+    current=Depends(require_user),
+):
+    # занятость по 15-минутным слотам (по времени начала записи, как /appointments_by_timeslot):
+    # {"days": {"2026-10-05": {"09:15": {"total": 2, "specialists": {"3": 1, "4": 1}}}}}
+    role = current["role"]
+    user = current["user"]
+
+    date_from = date_from or date.today().replace(day=1)
+    if date_to is None:
+        next_month = (date_from.replace(day=28) + timedelta(days=4)).replace(day=1)
+        date_to = next_month - timedelta(days=1)
+    if date_to < date_from or (date_to - date_from).days > 62:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+
+    cache_key = (role, None if role == "director" else user.id, date_from, date_to, branch)
+    cached = occupancy_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    day_col = cast(models.Appointments.date_of_appointment, Date)
+    hour_col = extract("hour", models.Appointments.date_of_appointment)
+    minute_col = extract("minute", models.Appointments.date_of_appointment)
+
+    period_start, period_end = day_bounds(date_from, date_to)
+    q = select(day_col, hour_col, minute_col, models.Appointments.user_id, func.count()).where(
+        models.Appointments.date_of_appointment >= period_start,
+        models.Appointments.date_of_appointment < period_end,
+    )
+    q = scope_appointments(q, role, user, branch)
+    q = q.group_by(day_col, hour_col, minute_col, models.Appointments.user_id)
+
+    res = await session.execute(q)
+
+    days: dict[str, dict] = {}
+    for day, hour, minute, user_id, count in res.all():
+        slot = f"{int(hour):02d}:{int(minute) // SLOT_MINUTES * SLOT_MINUTES:02d}"
+        cell = days.setdefault(str(day), {}).setdefault(slot, {"total": 0, "specialists": {}})
+        cell["total"] += count
+        cell["specialists"][str(user_id)] = cell["specialists"].get(str(user_id), 0) + count
+
+    result = {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "slot_minutes": SLOT_MINUTES,
+        "days": days,
+    }
+    occupancy_cache.set(cache_key, result)
+    return result
+
+
+def _invalidate_free_slots(message: dict):
+    if message.get("type") == "table_changed":
+        return
+    dates = message.get("dates") or ([message["date"]] if message.get("date") else None)
+    if dates is None:
+        free_slots_cache.clear()
+        return
+    days = {date.fromisoformat(day) for day in dates}
+    free_slots_cache.invalidate_where(lambda key: key[1] in days)
+
+
+# (user_id, день) -> занятые интервалы [(начало, конец)] этого специалиста за день
+free_slots_cache = TTLCache(ttl=FREE_SLOTS_CACHE_TTL)
+websocket_manager.listeners.append(_invalidate_free_slots)
+
+
+def parse_clock(value: str) -> time:
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time format: {value}")
+
+
+@app.get("/free_slots")
+async def get_free_slots(
+    date_from: date = Query(..., description="Дата начала (YYYY-MM-DD)"),
+    date_to: date | None = Query(None, description="Дата конца (YYYY-MM-DD), по умолчанию равна date_from"),
+    duration: int = Query(DEFAULT_APPOINTMENT_DURATION, ge=5, le=720, description="Длительность записи, минуты"),
+    user_id: int | None = Query(None, description="Специалист; без него — все специалисты филиала"),
+    branch: str | None = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
+    start: str = Query(WORKDAY_START, description="Начало рабочего дня, HH:MM"),
+    end: str = Query(WORKDAY_END, description="Конец рабочего дня, HH:MM"),
+    step: int = Query(SLOT_MINUTES, ge=5, le=120, description="Шаг сетки начал, минуты"),
+    db: AsyncSession = Depends(get_db),
+    current=Depends(require_user),
+):
+    # свободные начала записей: {"specialists": [{"user_id": 3, "days": {"2026-10-05": ["10:00", "12:15"]}}]}
+    role = current["role"]
+    user = current["user"]
+
+    date_to = date_to or date_from
+    if date_to < date_from or (date_to - date_from).days > 31:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    day_start, day_end = parse_clock(start), parse_clock(end)
+    if day_end <= day_start:
+        raise HTTPException(status_code=400, detail="Invalid working hours")
+
+    if role == "admin":
+        branch = current["branch"]
+    specialists = await load_specialists(db, branch)
+    if role not in ("director", "admin"):
+        user_id = user.id
+        specialists = [{"id": user.id}]
+    if user_id is not None:
+        specialists = [s for s in specialists if s["id"] == user_id]
+        if not specialists:
+            raise HTTPException(status_code=404, detail="Specialist not found")
+    user_ids = [s["id"] for s in specialists]
+
+    days = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+    busy = {(uid, day): free_slots_cache.get((uid, day)) for uid in user_ids for day in days}
+    missing_users = sorted({uid for (uid, _), intervals in busy.items() if intervals is None})
+    if missing_users:
+        # один запрос по индексу (user_id, date_of_appointment) за весь период для всех, кого нет в кэше
+        period_start, period_end = day_bounds(date_from, date_to)
+        res = await db.execute(
+            select(
+                models.Appointments.user_id,
+                models.Appointments.date_of_appointment,
+                models.Appointments.duration,
+            ).where(
+                models.Appointments.user_id.in_(missing_users),
+                models.Appointments.date_of_appointment >= period_start,
+                models.Appointments.date_of_appointment < period_end,
+            )
+        )
+        loaded = {(uid, day): [] for uid in missing_users for day in days}
+        for uid, starts_at, minutes in res.all():
+            loaded[(uid, starts_at.date())].append(
+                (starts_at, starts_at + timedelta(minutes=minutes or DEFAULT_APPOINTMENT_DURATION))
+            )
+        for key, intervals in loaded.items():
+            free_slots_cache.set(key, intervals)
+        busy.update(loaded)
+
+    now = datetime.now()
+    result = []
+    for uid in user_ids:
+        free_days = {}
+        for day in days:
+            starts = free_starts(
+                busy[(uid, day)],
+                datetime.combine(day, day_start),
+                datetime.combine(day, day_end),
+                timedelta(minutes=duration),
+                timedelta(minutes=step),
+                not_before=now,
+            )
+            if starts:
+                free_days[day.isoformat()] = [moment.strftime("%H:%M") for moment in starts]
+        result.append({"user_id": uid, "days": free_days})
+
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "duration": duration,
+        "step": step,
+        "specialists": result,
+    }
+
+
 @app.get("/protected")
 async def protected(current=Depends(require_user)):
     return {"msg": "ok", "user": current["user"].email, "role": current["role"]}
@@ -520,26 +1225,41 @@ async def finish_appointment(
     db: AsyncSession = Depends(get_db),
     current=Depends(require_user),
 ):
-    result = await db.execute(
-        select(models.Appointments).where(models.Appointments.id == appointment_id)
+    # UPDATE ... RETURNING и прибавка в daily_revenue одним запросом. Условие is_finished IS NOT TRUE
+    # делает повторный/параллельный finish безвредным: второй UPDATE дождётся первого и ничего не изменит
+    finished = (
+        update(models.Appointments)
+        .where(models.Appointments.id == appointment_id, models.Appointments.is_finished.isnot(True))
+        .values(is_finished=True)
+        .returning(
+            models.Appointments.user_id,
+            models.Appointments.date_of_appointment,
+            models.Appointments.price,
+            models.Appointments.discount,
+        )
+        .cte("finished")
+    )
+    stmt = (
+        select(models.Appointments.date_of_appointment, models.Users.baitursynov, models.Users.gagarina)
+        .join(models.Users, models.Appointments.user_id == models.Users.id)
+        .where(models.Appointments.id == appointment_id)
+        .add_cte(revenue_from_returning(finished))
     )
-    appointment = result.scalar_one_or_none()
+    row = (await db.execute(stmt)).first()
 
-    if not appointment:
+    if row is None:
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Appointment not found")
 
-    appointment.is_finished = True
     await db.commit()
-    await db.refresh(appointment)
-    
-    
+
     await websocket_manager.broadcast({
         "type": "appointment_completed",
-        "date": appointment.date_of_appointment.date().isoformat(),
-        "branch": "all",
+        "date": row.date_of_appointment.date().isoformat(),
+        "branches": specialist_branches(row.baitursynov, row.gagarina),
         "appointment_id": appointment_id
     })
-    
+
     return {"message": "Appointment finished"}
 
 @app.post("/clients", response_model=schema.ClientRead)
@@ -559,6 +1279,7 @@ async def create_client(
     try:
         await db.commit()
         await db.refresh(new_client)
+        await table_changed("clients")
         return new_client
     except Exception as e:
         await db.rollback()
@@ -566,28 +1287,135 @@ async def create_client(
 
 
 
+@app.post("/clients/import")
+async def import_clients(
+    file: UploadFile = File(..., description="XLSX или CSV с колонками f_name, l_name, m_name, phone, email"),
+    current=Depends(require_user),
+    db: AsyncSession = Depends(get_db),
+):
+    filename = (file.filename or "").lower()
+    if filename.endswith(".xlsx"):
+        reader = client_import.iter_xlsx
+    elif filename.endswith(".csv"):
+        reader = client_import.iter_csv
+    else:
+        raise HTTPException(status_code=400, detail="Only .xlsx and .csv files are supported")
+
+    # дубли ищем по нормализованному телефону и email — и среди уже существующих клиентов, и внутри файла
+    seen_phones: set[str] = set()
+    seen_emails: set[str] = set()
+    existing = await db.stream(select(models.Clients.phone, models.Clients.email))
+    async for phone, email in existing:
+        if phone := client_import.normalize_phone(phone):
+            seen_phones.add(phone)
+        if email := client_import.normalize_email(email):
+            seen_emails.add(email)
+
+    imported = 0
+    duplicates = 0
+    error_count = 0
+    errors = []
+
+    try:
+        rows = reader(file.file)
+        connection = await db.connection()
+        raw_connection = (await connection.get_raw_connection()).driver_connection
+
+        while True:
+            # разбор файла (openpyxl/csv) синхронный — читаем пачками в отдельном потоке
+            batch = await asyncio.to_thread(client_import.next_batch, rows, CLIENT_IMPORT_BATCH)
+            if not batch:
+                break
+
+            records = []
+            for row_number, row in batch:
+                try:
+                    client_import.validate_lengths(row)
+                    client = schema.ClientCreate(**row)
+                except ValidationError as e:
+                    message = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                    error_count += 1
+                    if len(errors) < CLIENT_IMPORT_MAX_ERRORS:
+                        errors.append({"row": row_number, "error": message})
+                    continue
+                except ValueError as e:
+                    error_count += 1
+                    if len(errors) < CLIENT_IMPORT_MAX_ERRORS:
+                        errors.append({"row": row_number, "error": str(e)})
+                    continue
+
+                phone = client_import.normalize_phone(client.phone)
+                email = client_import.normalize_email(client.email)
+                if (phone and phone in seen_phones) or (email and email in seen_emails):
+                    duplicates += 1
+                    continue
+                if phone:
+                    seen_phones.add(phone)
+                if email:
+                    seen_emails.add(email)
+
+                records.append(tuple(getattr(client, column) for column in client_import.COLUMNS))
+
+            if records:
+                await raw_connection.copy_records_to_table(
+                    "clients", records=records, columns=list(client_import.COLUMNS)
+                )
+                imported += len(records)
+
+        await db.commit()
+    except (ValueError, zipfile.BadZipFile) as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid file: {e}")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error importing clients: {e}")
+    finally:
+        await file.close()
+
+    if imported:
+        await table_changed("clients")
+
+    return {
+        "imported": imported,
+        "duplicates": duplicates,
+        "error_count": error_count,
+        "errors": errors,
+    }
+
+
 @app.delete("/clients/{client_id}")
 async def delete_client(
     client_id: int,
     current=Depends(require_user),
     db: AsyncSession = Depends(get_db),
 ):
+    # записи клиента остаются без клиента (как делал ORM при db.delete), сам клиент удаляется тем же запросом
+    detached = (
+        update(models.Appointments)
+        .where(models.Appointments.client_id == client_id)
+        .values(client_id=None)
+        .returning(models.Appointments.id)
+        .cte("detached")
+    )
+    stmt = (
+        delete(models.Clients)
+        .where(models.Clients.id == client_id)
+        .returning(models.Clients.id)
+        .add_cte(detached)
+    )
     try:
-        result = await db.execute(
-            select(models.Clients).where(models.Clients.id == client_id)
-        )
-        client = result.scalar_one_or_none()
-
-        if client:
-            await db.delete(client)
-            await db.commit()
-            return {"message": "Client deleted successfully"}
-        else:
-            raise HTTPException(status_code=404, detail="Client not found")
+        deleted = (await db.execute(stmt)).scalar_one_or_none()
+        await db.commit()
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting client: {e}")
 
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    await table_changed("clients")
+    return {"message": "Client deleted successfully"}
+
 
 
 
@@ -614,6 +1442,7 @@ async def create_expense(
     try:
         await db.commit()
         await db.refresh(new_expense)
+        await table_changed("expenses")
         return new_expense
     except Exception as e:
         await db.rollback()
@@ -627,21 +1456,20 @@ async def delete_expense(
     db: AsyncSession = Depends(get_db),
 ):
     try:
-        result = await db.execute(
-            select(models.Expenses).where(models.Expenses.id == expense_id)
-        )
-        expense = result.scalar_one_or_none()
-
-        if not expense:
-            raise HTTPException(status_code=404, detail="Expense not found")
-
-        await db.delete(expense)
+        deleted = (await db.execute(
+            delete(models.Expenses).where(models.Expenses.id == expense_id).returning(models.Expenses.id)
+        )).scalar_one_or_none()
         await db.commit()
-        return {"message": "Expense deleted successfully"}
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error deleting expense: {e}")
 
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Expense not found")
+
+    await table_changed("expenses")
+    return {"message": "Expense deleted successfully"}
+
 
 
 async def calculate_salaries(
@@ -651,12 +1479,10 @@ async def calculate_salaries(
     start_date: date | None = None,
     end_date: date | None = None,
 ):
-    net_amount = (
-        (func.coalesce(models.Appointments.price, 0)
-         - (func.coalesce(models.Appointments.price, 0) * (func.coalesce(models.Appointments.discount, 0) / 100.0)))
-    )
-
-    salary_expr = func.sum(net_amount * (func.coalesce(models.Salaries.percent, 0) / 100.0)).label("salary")
+    # читаем дневную сводку daily_revenue вместо всех завершённых записей
+    salary_expr = func.sum(
+        models.DailyRevenue.net * (func.coalesce(models.Salaries.percent, 0) / 100.0)
+    ).label("salary")
 
     q = (
         select(
@@ -666,15 +1492,16 @@ async def calculate_salaries(
             models.Users.m_name,
             salary_expr
         )
-        .join(models.Appointments, models.Appointments.user_id == models.Users.id)
+        .join(models.DailyRevenue, models.DailyRevenue.user_id == models.Users.id)
         .outerjoin(models.Salaries, models.Salaries.user_id == models.Users.id)
-        .where(models.Appointments.is_finished == True)
+        .where(models.DailyRevenue.count > 0)
     )
 
     
     if start_date and end_date:
         q = q.where(
-            func.date(models.Appointments.date_of_appointment).between(start_date, end_date)
+            models.DailyRevenue.day >= start_date,
+            models.DailyRevenue.day <= end_date,
         )
 
     q = q.group_by(
@@ -703,7 +1530,7 @@ async def get_salaries(
     start_date: str | None = Query(None, description="Дата начала периода (YYYY-MM-DD)"),
     end_date: str | None = Query(None, description="Дата конца периода (YYYY-MM-DD)"),
     current=Depends(require_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     role = current["role"]
     user = current["user"]
@@ -726,3 +1553,156 @@ async def get_salaries(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating salaries: {e}")
 
+
+
+@app.get("/salaries/export")
+async def export_salaries(
+    format: str = Query("xlsx", pattern="^(xlsx|csv)$"),
+    start_date: date | None = Query(None, description="Дата начала периода (YYYY-MM-DD)"),
+    end_date: date | None = Query(None, description="Дата конца периода (YYYY-MM-DD)"),
+    current=Depends(require_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    # по строке на специалиста, посчитанной из daily_revenue, — курсор тут не нужен
+    rows = await calculate_salaries(db, current["role"], current["user"], start_date, end_date)
+    return export_response(
+        format,
+        "salaries",
+        ("ID", "Имя", "Фамилия", "Отчество", "Зарплата"),
+        rows_from(
+            [(r["id"], r["f_name"], r["l_name"], r["m_name"], round(r["salary"] or 0, 2)) for r in rows]
+        ),
+        period_suffix(start_date, end_date),
+    )
+
+
+
+statistics_cache = TTLCache(ttl=STATISTICS_CACHE_TTL)
+websocket_manager.listeners.append(
+    lambda message: statistics_cache.clear() if message.get("type") != "table_changed" else None
+)
+
+STATISTICS_DIMENSIONS = ("branch", "specialist", "type_of_massage")
+
+
+@app.get("/statistics")
+async def get_statistics(
+    date_from: date | None = Query(None, description="Дата начала периода (YYYY-MM-DD), по умолчанию начало месяца"),
+    date_to: date | None = Query(None, description="Дата конца периода (YYYY-MM-DD), по умолчанию сегодня"),
+    period: str = Query("day", pattern="^(day|week|month)$"),
+    group_by: str | None = Query(None, description="branch, specialist или type_of_massage"),
+    branch: str | None = Query(None, description="Фильтр по филиалу: baitursynov, gagarina"),
+    only_finished: bool = Query(True),
+    current=Depends(require_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if group_by is not None and group_by not in STATISTICS_DIMENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid group_by")
+
+    role = current["role"]
+    user = current["user"]
+    today = date.today()
+    date_to = date_to or today
+    date_from = date_from or date_to.replace(day=1)
+
+    # закрытые периоды кэшируем; кэш сбрасывается на любое событие по записям
+    cache_key = (role, None if role == "director" else user.id, date_from, date_to, period, group_by, branch, only_finished)
+    closed = date_to < today
+    if closed:
+        cached = statistics_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    price = func.coalesce(models.Appointments.price, 0)
+    net = price - price * (func.coalesce(models.Appointments.discount, 0) / 100.0)
+    # literal, а не параметр: иначе Postgres не сопоставит выражение в SELECT и GROUP BY
+    period_col = func.date_trunc(
+        literal_column(f"'{period}'"), models.Appointments.date_of_appointment, type_=DateTime
+    )
+
+    key_cols = []
+    if group_by == "branch":
+        # специалист из обоих филиалов попадает в каждый: join с (VALUES ('baitursynov'), ('gagarina'))
+        # по флагам даёт строку на каждый выставленный флаг
+        branch_names = values(column("branch", String), name="branch_names").data([(b,) for b in BRANCHES])
+        key_cols = [branch_names.c.branch]
+    elif group_by == "specialist":
+        key_cols = [models.Users.id, models.Users.f_name, models.Users.l_name]
+    elif group_by == "type_of_massage":
+        key_cols = [models.Appointments.type_of_massage]
+
+    period_start, period_end = day_bounds(date_from, date_to)
+    q = (
+        select(
+            period_col,
+            *key_cols,
+            models.Appointments.type_of_payment,
+            func.sum(price),
+            func.sum(net),
+            func.count(),
+        )
+        .select_from(models.Appointments)
+        .join(models.Users, models.Appointments.user_id == models.Users.id)
+        .where(
+            models.Appointments.date_of_appointment >= period_start,
+            models.Appointments.date_of_appointment < period_end,
+        )
+    )
+    q = scope_appointments(q, role, user, branch, users_joined=True)
+    if group_by == "branch":
+        q = q.join(branch_names, or_(*(
+            and_(branch_names.c.branch == b, getattr(models.Users, b) == True) for b in BRANCHES
+        )))
+        if branch in BRANCHES:
+            q = q.where(branch_names.c.branch == branch)
+        elif role == "admin":
+            q = q.where(branch_names.c.branch == current["branch"])
+    if only_finished:
+        q = q.where(models.Appointments.is_finished == True)
+    q = q.group_by(period_col, *key_cols, models.Appointments.type_of_payment).order_by(period_col)
+
+    res = await db.execute(q)
+
+    # строки приходят в разрезе типа оплаты — сворачиваем их в одну строку на (период, ключ)
+    rows: dict[tuple, dict] = {}
+    for period_value, *keys, payment, gross, net_sum, count in res.all():
+        keys = tuple(keys)
+        row = rows.get((period_value, keys))
+        if row is None:
+            row = rows[(period_value, keys)] = {
+                "period": period_value.date().isoformat(),
+                "key": statistics_key(group_by, keys),
+                "revenue": 0.0,
+                "gross": 0,
+                "appointments": 0,
+                "payments": {},
+            }
+        row["revenue"] += float(net_sum or 0)
+        row["gross"] += int(gross or 0)
+        row["appointments"] += count
+        row["payments"][payment or "unknown"] = {"appointments": count, "revenue": round(float(net_sum or 0), 2)}
+
+    for row in rows.values():
+        row["discount"] = round(row["gross"] - row["revenue"], 2)
+        row["average_check"] = round(row["revenue"] / row["appointments"], 2) if row["appointments"] else 0
+        row["revenue"] = round(row["revenue"], 2)
+
+    result = {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "period": period,
+        "group_by": group_by,
+        "rows": list(rows.values()),
+    }
+    if closed:
+        statistics_cache.set(cache_key, result)
+    return result
+
+
+def statistics_key(group_by: str | None, keys: tuple):
+    if group_by == "specialist":
+        user_id, f_name, l_name = keys
+        return {"id": user_id, "name": " ".join(filter(None, [f_name, l_name]))}
+    if group_by is not None:
+        return keys[0]
+    return None
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+from typing import Callable
+
+import asyncpg
+
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresBackplane:
+    # события WebSocket между воркерами через LISTEN/NOTIFY на отдельном соединении asyncpg:
+    # каждый воркер (и тот, что опубликовал) получает NOTIFY и рассылает его своим сокетам
+    def __init__(self, dsn: str, channel: str, on_message: Callable[[dict], None]):
+        self.dsn = dsn
+        self.channel = channel
+        self.on_message = on_message
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+        self._conn: asyncpg.Connection | None = None
+        self._lock = asyncio.Lock()
+        self._reconnect_task: asyncio.Task | None = None
+        self._closing = False
+
+    async def start(self):
+        await self._connect()
+
+    async def stop(self):
+        self._closing = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def _connect(self):
+        conn = await asyncpg.connect(self.dsn)
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(self._on_terminate)
+        self._conn = conn
+
+    async def _reconnect(self):
+        delay = 1
+        while not self._closing:
+            try:
+                await self._connect()
+                logger.info("backplane reconnected")
+                return
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("backplane reconnect failed: %s", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _on_terminate(self, connection):
+        if self._closing:
+            return
+        self._conn = None
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.received += 1
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("backplane: bad payload %r", payload)
+            return
+        self.on_message(message)
+
+    async def publish(self, message: dict) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            # одно соединение не умеет выполнять запросы параллельно
+            async with self._lock:
+                await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, json.dumps(message))
+        except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            self.errors += 1
+            logger.warning("backplane publish failed: %s", e)
+            return False
+        self.published += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "connected": self._conn is not None,
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+        }
@@ -0,0 +1,49 @@
+import time
+from typing import Any, Callable, Hashable
+
+
+# кэш живёт внутри одного процесса: TTL держим коротким,
+# а все места, которые меняют закэшированные данные, вызывают invalidate()
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 10_000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if len(self._data) >= self.maxsize and key not in self._data:
+            self._evict()
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._data.items() if expires < now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            # dict хранит порядок вставки — выбрасываем самую старую запись
+            self._data.pop(next(iter(self._data)))
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,111 @@
+import csv
+import io
+import re
+from typing import BinaryIO, Iterator
+
+from openpyxl import load_workbook
+
+
+COLUMNS = ("f_name", "l_name", "m_name", "phone", "email", "visit")
+MAX_LENGTHS = {"f_name": 255, "l_name": 255, "m_name": 255, "phone": 20, "email": 320}
+
+# заголовки, которые встречаются в выгрузках из таблиц
+HEADER_ALIASES = {
+    "имя": "f_name",
+    "фамилия": "l_name",
+    "отчество": "m_name",
+    "телефон": "phone",
+    "почта": "email",
+    "e-mail": "email",
+    "визиты": "visit",
+}
+
+
+def normalize_phone(phone: str | None) -> str | None:
+    digits = re.sub(r"\D", "", phone or "")
+    # 8 701 ... и +7 701 ... — один и тот же номер
+    if len(digits) == 11 and digits.startswith("8"):
+        digits = "7" + digits[1:]
+    return digits or None
+
+
+def phone_variants(phone: str | None) -> set[str]:
+    # телефоны в базе хранятся как введены — для поиска нужны оба написания полного номера: 7… и 8…
+    digits = normalize_phone(phone)
+    if not digits:
+        return set()
+    if len(digits) == 11 and digits.startswith("7"):
+        return {digits, "8" + digits[1:]}
+    return {digits}
+
+
+def normalize_email(email: str | None) -> str | None:
+    return email.strip().lower() if email else None
+
+
+def _cell(value) -> str | None:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # телефоны в Excel часто хранятся числом
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _header(values) -> list[str | None]:
+    header = []
+    for value in values:
+        name = (_cell(value) or "").lower()
+        name = HEADER_ALIASES.get(name, name)
+        header.append(name if name in COLUMNS else None)
+    if not any(header):
+        raise ValueError(f"No known columns in header, expected some of {', '.join(COLUMNS)}")
+    return header
+
+
+def _rows(header: list[str | None], rows) -> Iterator[tuple[int, dict]]:
+    # номера строк как в файле: заголовок — строка 1
+    for number, values in enumerate(rows, start=2):
+        row = {name: _cell(value) for name, value in zip(header, values) if name}
+        if any(row.values()):
+            yield number, row
+
+
+def iter_xlsx(file: BinaryIO) -> Iterator[tuple[int, dict]]:
+    # read_only — openpyxl читает лист потоком, не загружая его целиком
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _header(next(rows, ()))
+        yield from _rows(header, rows)
+    finally:
+        workbook.close()
+
+
+def iter_csv(file: BinaryIO) -> Iterator[tuple[int, dict]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    rows = csv.reader(text, dialect)
+    header = _header(next(rows, ()))
+    yield from _rows(header, rows)
+
+
+def validate_lengths(row: dict):
+    for name, limit in MAX_LENGTHS.items():
+        if row.get(name) and len(row[name]) > limit:
+            raise ValueError(f"{name} longer than {limit} characters")
+
+
+def next_batch(rows: Iterator[tuple[int, dict]], size: int) -> list[tuple[int, dict]]:
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            break
+    return batch
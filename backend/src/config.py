@@ -11,4 +11,83 @@ DB_PORT = os.getenv('DB_PORT')
 DB_NAME = os.getenv('DB_NAME')
 
 DATABASE_URL = f'postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
-JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
\ No newline at end of file
+ASYNCPG_DSN = f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
+# реплика только для чтения (postgresql+asyncpg://...); не задана — всё идёт в основную базу
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+# сколько секунд после своей записи клиент читает из основной базы, чтобы не увидеть отставание реплики
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+
+# пул соединений с базой: постоянные соединения, сколько можно открыть сверх них,
+# сколько секунд ждать свободное, через сколько секунд пересоздавать соединение
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+# проверять соединение перед выдачей из пула — лишний round trip на каждый запрос, поэтому выключено;
+# включать, если между приложением и Postgres есть что-то, что рвёт простаивающие соединения
+# (балансировщик, pgbouncer с таймаутом) или база часто перезапускается
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'false').lower() == 'true'
+# сколько соединений открыть при старте приложения (по умолчанию — весь постоянный пул)
+DB_POOL_WARM = int(os.getenv('DB_POOL_WARM', os.getenv('DB_POOL_SIZE', '10')))
+# кэш подготовленных запросов asyncpg на одно соединение; 0 — выключить (нужно за pgbouncer в transaction mode)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+
+# сколько секунд держать пользователя в кэше get_current_user_data
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+# true — брать role/branch из JWT без запроса к users (изменения прав вступят в силу после обновления токена)
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv('AUTH_TRUST_TOKEN_CLAIMS', 'false').lower() == 'true'
+
+# стоимость bcrypt; хэши с меньшей стоимостью пересчитываются при входе
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+# потоки для хэширования паролей и сколько запросов может ждать в очереди, прежде чем отвечать 503
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '32'))
+
+# размер исходящей очереди на один WebSocket и что делать при переполнении:
+# disconnect — закрыть медленного клиента, drop_oldest — выкинуть самое старое сообщение
+WS_QUEUE_SIZE = int(os.getenv('WS_QUEUE_SIZE', '100'))
+WS_OVERFLOW_POLICY = os.getenv('WS_OVERFLOW_POLICY', 'disconnect')
+# максимальная длина диапазона дат в одной подписке
+WS_MAX_SUBSCRIPTION_DAYS = int(os.getenv('WS_MAX_SUBSCRIPTION_DAYS', '62'))
+
+# true — рассылать события WebSocket через Postgres LISTEN/NOTIFY (нужно при нескольких воркерах)
+WS_BACKPLANE = os.getenv('WS_BACKPLANE', 'false').lower() == 'true'
+WS_BACKPLANE_CHANNEL = os.getenv('WS_BACKPLANE_CHANNEL', 'crm_events')
+# ETag/304 для справочников: версии таблиц живут в памяти процесса и узнают о чужих записях только
+# через backplane — без него включать только если приложение запущено одним процессом
+SINGLE_PROCESS = os.getenv('SINGLE_PROCESS', 'false').lower() == 'true'
+REFERENCE_ETAGS = WS_BACKPLANE or SINGLE_PROCESS
+
+# сколько секунд хранить список специалистов (кэш также сбрасывается при изменении users)
+SPECIALISTS_CACHE_TTL = float(os.getenv('SPECIALISTS_CACHE_TTL', '300'))
+
+# сколько секунд хранить статистику за закрытые периоды (кэш также сбрасывается на событиях по записям)
+STATISTICS_CACHE_TTL = float(os.getenv('STATISTICS_CACHE_TTL', '3600'))
+# матрица занятости /occupancy; сбрасывается на событиях по записям
+OCCUPANCY_CACHE_TTL = float(os.getenv('OCCUPANCY_CACHE_TTL', '300'))
+# занятые интервалы специалиста по дням для /free_slots; сбрасываются на событиях по записям за этот день
+FREE_SLOTS_CACHE_TTL = float(os.getenv('FREE_SLOTS_CACHE_TTL', '300'))
+
+# рабочие часы по умолчанию для /free_slots и длительность записи, у которой duration не указана (минуты)
+WORKDAY_START = os.getenv('WORKDAY_START', '10:00')
+WORKDAY_END = os.getenv('WORKDAY_END', '21:00')
+DEFAULT_APPOINTMENT_DURATION = int(os.getenv('DEFAULT_APPOINTMENT_DURATION', '60'))
+
+# максимум записей в одном POST /appointments/bulk
+BULK_APPOINTMENTS_LIMIT = int(os.getenv('BULK_APPOINTMENTS_LIMIT', '100'))
+
+# импорт клиентов: строк в одном COPY и сколько ошибок по строкам возвращать в ответе
+CLIENT_IMPORT_BATCH = int(os.getenv('CLIENT_IMPORT_BATCH', '1000'))
+CLIENT_IMPORT_MAX_ERRORS = int(os.getenv('CLIENT_IMPORT_MAX_ERRORS', '1000'))
+
+# GET /appointments/changes: последние секунды не отдаём, пока в них могут досохраняться транзакции,
+# и сколько дней хранить сведения об удалённых записях (курсор старше — 410, клиент перечитывает всё)
+CHANGES_LAG_SECONDS = float(os.getenv('CHANGES_LAG_SECONDS', '2'))
+CHANGES_RETENTION_DAYS = int(os.getenv('CHANGES_RETENTION_DAYS', '7'))
+
+# выгрузки: сколько строк за раз читать из серверного курсора
+EXPORT_BATCH = int(os.getenv('EXPORT_BATCH', '2000'))
+
+# если задан — /metrics отдаётся только с заголовком Authorization: Bearer <METRICS_TOKEN>
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
@@ -1,18 +1,122 @@
+import asyncio
+import logging
+import time
+
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .models import Base
-from .config import DATABASE_URL
+from .config import (
+    DATABASE_URL, DATABASE_REPLICA_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE,
+)
 
 
-engine = create_async_engine(
-    url=DATABASE_URL,
-)
+logger = logging.getLogger(__name__)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # сколько запросы ждут соединение из пула — по этим цифрам и подбирается DB_POOL_SIZE
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+
+def make_engine(url: str):
+    return create_async_engine(
+        url=url,
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+    )
+
+
+engine = make_engine(DATABASE_URL)
+replica_engine = make_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
 
 async_session = async_sessionmaker(
     engine, expire_on_commit=False
 )
+replica_session = async_sessionmaker(replica_engine, expire_on_commit=False) if replica_engine else None
+
+# ставится на ответы пишущих запросов (см. middleware в app.py), пока жива — чтение идёт в основную базу
+READ_PRIMARY_COOKIE = "read_primary"
 
 async def get_db() -> AsyncSession:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+def read_sessionmaker(request: Request) -> async_sessionmaker:
+    if replica_session is None or request.cookies.get(READ_PRIMARY_COOKIE):
+        return async_session
+    return replica_session
+
+
+async def get_read_db(request: Request, primary: AsyncSession = Depends(get_db)) -> AsyncSession:
+    # для обработчиков, которые только читают: реплика, если она настроена. Иначе — та же сессия get_db,
+    # что у get_current_user_data (FastAPI кэширует зависимость): одно соединение из пула на запрос
+    sessionmaker = read_sessionmaker(request)
+    if sessionmaker is async_session:
+        yield primary
+        return
+    async with sessionmaker() as session:
+        yield session
+
+
+async def warm_pool(connections: int):
+    # открываем соединения заранее, чтобы первые запросы после деплоя не платили за connect
+    async def touch(target):
+        async with target.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+
+    targets = [e for e in (engine, replica_engine) if e is not None]
+    try:
+        await asyncio.gather(*(touch(e) for e in targets for _ in range(min(connections, DB_POOL_SIZE))))
+    except Exception as e:
+        # база может подняться позже приложения — тогда пул наполнится по мере запросов
+        logger.warning("pool warm-up failed: %s", e)
+
+
+def _pool_stats(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "wait_avg_ms": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+        "wait_max_ms": round(pool.wait_max * 1000, 3),
+    }
+
+
+def db_pool_stats() -> dict:
+    stats = _pool_stats(engine.pool)
+    if replica_engine is not None:
+        stats["replica"] = _pool_stats(replica_engine.pool)
+    return stats
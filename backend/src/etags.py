@@ -0,0 +1,34 @@
+import hashlib
+import secrets
+from collections import defaultdict
+
+from fastapi import Request
+
+
+# справочники: путь -> таблицы, от которых зависит ответ
+REFERENCE_ROUTES = {
+    "/users": ("users",),
+    "/specialists": ("users",),
+    "/clients": ("clients",),
+    "/expenses": ("expenses",),
+}
+
+
+class TableVersions:
+    # версия таблицы растёт на каждой записи в неё (событие table_changed доходит до всех воркеров);
+    # в ETag входит ещё id процесса — у другого воркера своя нумерация, и его ETag просто не совпадёт
+    def __init__(self):
+        self.instance = secrets.token_hex(4)
+        self.versions: dict[str, int] = defaultdict(int)
+        self.not_modified = 0
+
+    def bump(self, table: str):
+        self.versions[table] += 1
+
+    def etag(self, request: Request, tables: tuple[str, ...]) -> str:
+        version = ".".join(str(self.versions[table]) for table in tables)
+        target = hashlib.blake2s(f"{request.url.path}?{request.url.query}".encode(), digest_size=4).hexdigest()
+        return f'W/"{self.instance}-{version}-{target}"'
+
+    def stats(self) -> dict:
+        return {"not_modified": self.not_modified, "versions": dict(self.versions)}
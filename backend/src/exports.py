@@ -0,0 +1,202 @@
+import asyncio
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Callable, Sequence
+from xml.sax.saxutils import escape
+
+from fastapi.responses import StreamingResponse
+
+from .config import EXPORT_BATCH
+from .db_init import async_session
+
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _value(value):
+    # xlsx и csv не знают про tz — в таблицу пишем локальное время как есть
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return value
+
+
+async def stream_rows(stmt, convert: Callable = tuple, sessionmaker=async_session) -> AsyncIterator[list]:
+    # ответ отдаётся уже после выхода из get_db, поэтому сессия своя;
+    # yield_per включает серверный курсор — в памяти только одна пачка строк
+    async with sessionmaker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH))
+        async for partition in result.partitions():
+            yield [[_value(v) for v in convert(row)] for row in partition]
+
+
+async def rows_from(rows: Sequence) -> AsyncIterator[list]:
+    yield [[_value(v) for v in row] for row in rows]
+
+
+async def csv_stream(header: Sequence[str], batches: AsyncIterator[list]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM — иначе Excel открывает UTF-8 с кириллицей как cp1251
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    async for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# минимальный набор частей xlsx: книга с одним листом и стилями для дат (s="1" — дата и время, s="2" — дата)
+XLSX_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+XLSX_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XLSX_DOC_RELS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        f'<Relationships xmlns="{XLSX_RELS}">'
+        f'<Relationship Id="rId1" Type="{XLSX_DOC_RELS}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        f'<Relationships xmlns="{XLSX_RELS}">'
+        f'<Relationship Id="rId1" Type="{XLSX_DOC_RELS}/worksheet" Target="worksheets/sheet1.xml"/>'
+        f'<Relationship Id="rId2" Type="{XLSX_DOC_RELS}/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/styles.xml": (
+        f'<styleSheet xmlns="{XLSX_MAIN}">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+EXCEL_EPOCH = datetime(1899, 12, 30)
+# символы, которые нельзя записать в XML 1.0
+XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _Sink:
+    # zipfile пишет сюда как в файл без seek (с data descriptor), а мы забираем готовые байты по мере записи
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, datetime):
+        return f'<c s="1"><v>{(value - EXCEL_EPOCH).total_seconds() / 86400}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="2"><v>{(value - EXCEL_EPOCH.date()).days}</v></c>'
+    text = escape(XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _rows_xml(rows) -> bytes:
+    return "".join("<row>" + "".join(_cell(v) for v in row) + "</row>" for row in rows).encode()
+
+
+def _write_rows(sheet, rows):
+    sheet.write(_rows_xml(rows))
+
+
+def _workbook_xml(title: str) -> str:
+    return (
+        f'<workbook xmlns="{XLSX_MAIN}" xmlns:r="{XLSX_DOC_RELS}"><sheets>'
+        f'<sheet name="{escape(title, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/>'
+        '</sheets></workbook>'
+    )
+
+
+async def xlsx_stream(header: Sequence[str], batches: AsyncIterator[list], title: str) -> AsyncIterator[bytes]:
+    # лист пишется в zip по мере чтения пачек из базы и сразу уходит клиенту — большая выгрузка
+    # не собирается целиком ни в памяти, ни во временном файле; сжатие — в отдельном потоке
+    sink = _Sink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    for name, content in {**XLSX_PARTS, "xl/workbook.xml": _workbook_xml(title)}.items():
+        archive.writestr(name, content)
+    sheet = archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+    sheet.write(f'<worksheet xmlns="{XLSX_MAIN}"><sheetData>'.encode() + _rows_xml([header]))
+    yield sink.take()
+
+    async for batch in batches:
+        await asyncio.to_thread(_write_rows, sheet, batch)
+        if data := sink.take():
+            yield data
+
+    sheet.write(b"</sheetData></worksheet>")
+    sheet.close()
+    archive.close()
+    yield sink.take()
+
+
+def export_response(
+    fmt: str, name: str, header: Sequence[str], batches: AsyncIterator[list], suffix: str = ""
+) -> StreamingResponse:
+    if fmt == "xlsx":
+        body = xlsx_stream(header, batches, name)
+    else:
+        body = csv_stream(header, batches)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}{suffix}.{fmt}"',
+            # nginx не должен копить ответ целиком перед отправкой клиенту
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def period_suffix(start: date | None, end: date | None) -> str:
+    if start and end:
+        return f"_{start.isoformat()}_{end.isoformat()}"
+    if start:
+        return f"_from_{start.isoformat()}"
+    if end:
+        return f"_to_{end.isoformat()}"
+    return ""
@@ -0,0 +1,168 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+
+# метрики в текстовом формате Prometheus без prometheus_client: счётчики живут в памяти воркера,
+# при нескольких воркерах Prometheus собирает каждый отдельно
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> list[str]:
+        out = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        out.append(f"{name}_sum{{{labels}}} {self.total}")
+        out.append(f"{name}_count{{{labels}}} {self.count}")
+        return out
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# запросы к базе, сделанные в рамках текущего HTTP-запроса
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+requests_total: dict[tuple[str, str, int], int] = defaultdict(int)
+request_latency: dict[tuple[str, str], Histogram] = {}
+request_queries: dict[tuple[str, str], Histogram] = {}
+db_queries_total: dict[str, int] = defaultdict(int)
+db_time_total: dict[str, float] = defaultdict(float)
+in_flight = 0
+
+
+def route_label(request) -> str:
+    # шаблон пути, а не сам путь — иначе /appointments/123 даст по серии на каждую запись
+    # route_path ставят middleware, которые отвечают сами, до роутинга (304 в conditional_get)
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.scope.get("route_path") or "unmatched"
+
+
+async def metrics_middleware(request, call_next):
+    global in_flight
+    stats = RequestStats()
+    token = current_request.set(stats)
+    in_flight += 1
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        in_flight -= 1
+        current_request.reset(token)
+
+        key = (request.method, route_label(request))
+        requests_total[key + (status_code,)] += 1
+        request_latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+        request_queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+        db_queries_total[key[1]] += stats.queries
+        db_time_total[key[1]] += stats.db_time
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+    else:
+        # фоновые задачи: backplane, пересчёт сводок, прогрев пула
+        db_queries_total["background"] += 1
+        db_time_total["background"] += elapsed
+
+
+def _handle_error(context):
+    # после ошибки after_cursor_execute не вызывается — убираем отметку времени сами
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+def instrument_engine(engine):
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _labels(**values) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in values.items())
+
+
+def render(gauges: dict[str, float] | None = None) -> str:
+    lines = [
+        "# HELP crm_http_requests_total HTTP requests by route and status.",
+        "# TYPE crm_http_requests_total counter",
+    ]
+    for (method, route, status_code), count in sorted(requests_total.items()):
+        lines.append(f"crm_http_requests_total{{{_labels(method=method, route=route, status=status_code)}}} {count}")
+
+    lines += [
+        "# HELP crm_http_request_duration_seconds HTTP request latency.",
+        "# TYPE crm_http_request_duration_seconds histogram",
+    ]
+    for (method, route), histogram in sorted(request_latency.items()):
+        lines += histogram.lines("crm_http_request_duration_seconds", _labels(method=method, route=route))
+
+    lines += [
+        "# HELP crm_http_request_db_queries DB queries issued per HTTP request.",
+        "# TYPE crm_http_request_db_queries histogram",
+    ]
+    for (method, route), histogram in sorted(request_queries.items()):
+        lines += histogram.lines("crm_http_request_db_queries", _labels(method=method, route=route))
+
+    lines += [
+        "# HELP crm_http_requests_in_flight HTTP requests being processed.",
+        "# TYPE crm_http_requests_in_flight gauge",
+        f"crm_http_requests_in_flight {in_flight}",
+        "# HELP crm_db_queries_total DB queries by route.",
+        "# TYPE crm_db_queries_total counter",
+    ]
+    for route, count in sorted(db_queries_total.items()):
+        lines.append(f"crm_db_queries_total{{{_labels(route=route)}}} {count}")
+
+    lines += [
+        "# HELP crm_db_query_seconds_total Time spent in DB queries by route.",
+        "# TYPE crm_db_query_seconds_total counter",
+    ]
+    for route, seconds in sorted(db_time_total.items()):
+        lines.append(f"crm_db_query_seconds_total{{{_labels(route=route)}}} {seconds}")
+
+    for name, value in (gauges or {}).items():
+        lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,32 @@
+"""appointments indexes
+
+Revision ID: 5c1e7a9d3b42
+Revises: ad29bbb85a2a
+Create Date: 2026-10-18 10:12:31.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a9d3b42'
+down_revision: Union[str, Sequence[str], None] = 'ad29bbb85a2a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_appointments_date_of_appointment'), 'appointments', ['date_of_appointment'], unique=False)
+    op.create_index('ix_appointments_user_id_date_of_appointment', 'appointments', ['user_id', 'date_of_appointment'], unique=False)
+    op.create_index(op.f('ix_appointments_client_id'), 'appointments', ['client_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_appointments_client_id'), table_name='appointments')
+    op.drop_index('ix_appointments_user_id_date_of_appointment', table_name='appointments')
+    op.drop_index(op.f('ix_appointments_date_of_appointment'), table_name='appointments')
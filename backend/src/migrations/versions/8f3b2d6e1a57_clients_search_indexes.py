@@ -0,0 +1,37 @@
+"""clients search indexes
+
+Revision ID: 8f3b2d6e1a57
+Revises: 5c1e7a9d3b42
+Create Date: 2026-10-18 11:40:05.203114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b2d6e1a57'
+down_revision: Union[str, Sequence[str], None] = '5c1e7a9d3b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_clients_f_name_trgm', 'clients', ['f_name'], unique=False, postgresql_using='gin', postgresql_ops={'f_name': 'gin_trgm_ops'})
+    op.create_index('ix_clients_l_name_trgm', 'clients', ['l_name'], unique=False, postgresql_using='gin', postgresql_ops={'l_name': 'gin_trgm_ops'})
+    # индекс по выражению autogenerate не видит, поэтому его нет в models.py
+    op.execute(
+        "CREATE INDEX ix_clients_phone_digits_trgm ON clients "
+        "USING gin (regexp_replace(phone, '\\D', '', 'g') gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_clients_phone_digits_trgm")
+    op.drop_index('ix_clients_l_name_trgm', table_name='clients', postgresql_using='gin')
+    op.drop_index('ix_clients_f_name_trgm', table_name='clients', postgresql_using='gin')
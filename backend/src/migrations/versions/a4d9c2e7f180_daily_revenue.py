@@ -0,0 +1,52 @@
+"""daily revenue
+
+Revision ID: a4d9c2e7f180
+Revises: 8f3b2d6e1a57
+Create Date: 2026-10-18 13:05:44.910372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d9c2e7f180'
+down_revision: Union[str, Sequence[str], None] = '8f3b2d6e1a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_revenue',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('gross', sa.BigInteger(), nullable=False),
+    sa.Column('net', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index(op.f('ix_daily_revenue_day'), 'daily_revenue', ['day'], unique=False)
+    # заполняем сводку по уже завершённым записям (то же, что python -m src.rollups)
+    op.execute(
+        """
+        INSERT INTO daily_revenue (user_id, day, gross, net, count)
+        SELECT user_id,
+               CAST(date_of_appointment AS DATE),
+               sum(coalesce(price, 0)),
+               CAST(sum(coalesce(price, 0) - coalesce(price, 0) * (coalesce(discount, 0) / 100.0)) AS NUMERIC(12, 2)),
+               count(*)
+        FROM appointments
+        WHERE is_finished = true
+        GROUP BY user_id, CAST(date_of_appointment AS DATE)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_daily_revenue_day'), table_name='daily_revenue')
+    op.drop_table('daily_revenue')
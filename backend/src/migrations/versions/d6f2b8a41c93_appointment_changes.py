@@ -0,0 +1,44 @@
+"""appointment changes
+
+Revision ID: d6f2b8a41c93
+Revises: a4d9c2e7f180
+Create Date: 2026-10-18 20:12:31.604218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f2b8a41c93'
+down_revision: Union[str, Sequence[str], None] = 'a4d9c2e7f180'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('appointments', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # у старых строк точного времени изменения нет — берём время создания
+    op.execute("UPDATE appointments SET updated_at = coalesce(date_of_creation, now())")
+    op.alter_column('appointments', 'updated_at', nullable=False, server_default=sa.text('statement_timestamp()'))
+    op.create_index('ix_appointments_updated_at_id', 'appointments', ['updated_at', 'id'], unique=False)
+
+    op.create_table('appointment_tombstones',
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date_of_appointment', sa.DateTime(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('statement_timestamp()'), nullable=False),
+    sa.PrimaryKeyConstraint('appointment_id')
+    )
+    op.create_index(op.f('ix_appointment_tombstones_deleted_at'), 'appointment_tombstones', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_appointment_tombstones_deleted_at'), table_name='appointment_tombstones')
+    op.drop_table('appointment_tombstones')
+    op.drop_index('ix_appointments_updated_at_id', table_name='appointments')
+    op.drop_column('appointments', 'updated_at')
@@ -1,12 +1,16 @@
 import datetime
+from decimal import Decimal
 
 from typing import Annotated
-from sqlalchemy import String, ForeignKey, Boolean
+from sqlalchemy import String, ForeignKey, Boolean, Index, BigInteger, Numeric, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
 int_pk = Annotated[int, mapped_column(primary_key=True)]
 
+# филиалы соответствуют булевым колонкам Users.baitursynov / Users.gagarina
+BRANCHES = ("baitursynov", "gagarina")
+
 
 class Base(DeclarativeBase):
     pass
@@ -33,6 +37,10 @@ class Users(Base):
 
 class Clients(Base):
     __tablename__ = 'clients'
+    __table_args__ = (
+        Index('ix_clients_f_name_trgm', 'f_name', postgresql_using='gin', postgresql_ops={'f_name': 'gin_trgm_ops'}),
+        Index('ix_clients_l_name_trgm', 'l_name', postgresql_using='gin', postgresql_ops={'l_name': 'gin_trgm_ops'}),
+    )
     id: Mapped[int_pk]
 
     f_name: Mapped[str | None] = mapped_column(String(255))
@@ -50,10 +58,15 @@ class Clients(Base):
 
 class Appointments(Base):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        Index('ix_appointments_user_id_date_of_appointment', 'user_id', 'date_of_appointment'),
+        # курсор GET /appointments/changes идёт по (updated_at, id)
+        Index('ix_appointments_updated_at_id', 'updated_at', 'id'),
+    )
     id: Mapped[int_pk]
 
     date_of_creation: Mapped[datetime.datetime]
-    date_of_appointment: Mapped[datetime.datetime]
+    date_of_appointment: Mapped[datetime.datetime] = mapped_column(index=True)
     is_finished: Mapped[bool | None] = mapped_column(Boolean, default=False)
 
     price: Mapped[int | None]
@@ -64,10 +77,15 @@ class Appointments(Base):
     duration: Mapped[int | None]
     service: Mapped[str | None] = mapped_column(String(255))
 
-
+    # меняется на каждой записи в строку: server_default для INSERT/COPY, onupdate для ORM и update().
+    # statement_timestamp, а не now(): now() — начало транзакции, а она может начаться задолго до записи
+    # (проверки в bulk, поиск пользователя), и строка оказалась бы позади уже отданного курсора /appointments/changes
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=func.statement_timestamp(), onupdate=func.statement_timestamp()
+    )
 
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
-    client_id: Mapped[int | None] = mapped_column(ForeignKey('clients.id'))
+    client_id: Mapped[int | None] = mapped_column(ForeignKey('clients.id'), index=True)
 
     user: Mapped["Users"] = relationship("Users", backref="appointments")
     clients: Mapped["Clients"] = relationship("Clients", backref="appointment")
@@ -75,6 +93,16 @@ class Appointments(Base):
 
 
 
+class AppointmentTombstones(Base):
+    # удалённые записи для GET /appointments/changes; старше CHANGES_RETENTION_DAYS вычищаются при удалении
+    __tablename__ = 'appointment_tombstones'
+
+    appointment_id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int]
+    date_of_appointment: Mapped[datetime.datetime]
+    deleted_at: Mapped[datetime.datetime] = mapped_column(server_default=func.statement_timestamp(), index=True)
+
+
 class Salaries(Base):
     __tablename__ = 'salaries'
     id: Mapped[int_pk]
@@ -90,3 +118,16 @@ class Expenses(Base):
 
     name: Mapped[str | None] = mapped_column(String(255))
     expense: Mapped[int]
+
+
+
+class DailyRevenue(Base):
+    # сумма завершённых записей специалиста за день; обновляется вместе с appointments (см. rollups.py)
+    __tablename__ = 'daily_revenue'
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    day: Mapped[datetime.date] = mapped_column(primary_key=True, index=True)
+
+    gross: Mapped[int] = mapped_column(BigInteger, default=0)
+    net: Mapped[Decimal] = mapped_column(Numeric(12, 2), default=0)
+    count: Mapped[int] = mapped_column(default=0)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from .config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE
+
+
+# min_rounds = rounds, чтобы needs_update() срабатывал на хэшах со старой стоимостью
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_lock = threading.Lock()
+_pending = 0
+
+
+def _release(_future):
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+async def _run(fn, *args):
+    # bcrypt отпускает GIL, так что потоки считают параллельно, а event loop остаётся свободным
+    global _pending
+    with _lock:
+        if _pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE:
+            raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+        _pending += 1
+
+    future = _executor.submit(fn, *args)
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_and_update_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    return await _run(pwd_context.verify_and_update, password, password_hash)
+
+
+def pool_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_limit": PASSWORD_HASH_QUEUE,
+        "pending": _pending,
+    }
@@ -0,0 +1,51 @@
+from fastapi import Response
+from pydantic import TypeAdapter
+from sqlalchemy import select
+
+from . import models, schema
+
+
+# лёгкий путь чтения записей: один SELECT с join вместо ORM-сущностей и двух selectinload,
+# строки сразу собираются в dict, а валидация и JSON делаются в pydantic-core
+APPOINTMENT_FIELDS = ("id",) + tuple(schema.AppointmentBase.model_fields)
+USER_FIELDS = tuple(schema.UserShort.model_fields)
+CLIENT_FIELDS = tuple(schema.ClientShort.model_fields)
+
+appointment_adapter = TypeAdapter(schema.AppointmentRead)
+appointment_list_adapter = TypeAdapter(list[schema.AppointmentRead])
+appointment_page_adapter = TypeAdapter(schema.AppointmentPage)
+appointment_changes_adapter = TypeAdapter(schema.AppointmentChanges)
+
+
+def select_appointment_reads(source=models.Appointments.__table__):
+    # source — таблица appointments или CTE с RETURNING (см. create_appointment);
+    # Users уже присоединена — в scope_appointments передавать users_joined=True
+    return (
+        select(
+            *(source.c[name] for name in APPOINTMENT_FIELDS),
+            source.c.client_id,
+            *(getattr(models.Users, name).label(f"user_{name}") for name in USER_FIELDS),
+            *(getattr(models.Clients, name).label(f"client_{name}") for name in CLIENT_FIELDS),
+        )
+        .join_from(source, models.Users, source.c.user_id == models.Users.id)
+        .outerjoin(models.Clients, source.c.client_id == models.Clients.id)
+    )
+
+
+def appointment_dicts(rows) -> list[dict]:
+    items = []
+    for row in rows:
+        row = row._mapping
+        item = {name: row[name] for name in APPOINTMENT_FIELDS}
+        item["user"] = {name: row[f"user_{name}"] for name in USER_FIELDS}
+        item["clients"] = (
+            {name: row[f"client_{name}"] for name in CLIENT_FIELDS}
+            if row["client_id"] is not None else None
+        )
+        items.append(item)
+    return items
+
+
+def json_response(adapter: TypeAdapter, data) -> Response:
+    # response_model у эндпоинтов остаётся для OpenAPI, повторной валидации FastAPI не будет
+    return Response(content=adapter.dump_json(adapter.validate_python(data)), media_type="application/json")
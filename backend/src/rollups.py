@@ -0,0 +1,78 @@
+import asyncio
+
+from sqlalchemy import select, delete, func, cast, text, Date, Numeric
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+
+def _on_conflict_add(stmt):
+    return stmt.on_conflict_do_update(
+        index_elements=[models.DailyRevenue.user_id, models.DailyRevenue.day],
+        set_={
+            "gross": models.DailyRevenue.gross + stmt.excluded.gross,
+            "net": models.DailyRevenue.net + stmt.excluded.net,
+            "count": models.DailyRevenue.count + stmt.excluded.count,
+        },
+    )
+
+
+def revenue_from_returning(changed, sign: int = 1, finished_only: bool = False):
+    # CTE для того же запроса, что меняет appointments: changed — CTE с RETURNING
+    # (user_id, date_of_appointment, price, discount[, is_finished]); сводка обновится тем же round trip
+    price = func.coalesce(changed.c.price, 0)
+    net = price - price * (func.coalesce(changed.c.discount, 0) / 100.0)
+    source = select(
+        changed.c.user_id,
+        cast(changed.c.date_of_appointment, Date),
+        sign * price,
+        sign * net,
+        sign,
+    )
+    if finished_only:
+        source = source.where(changed.c.is_finished == True)
+    stmt = insert(models.DailyRevenue).from_select(["user_id", "day", "gross", "net", "count"], source)
+    return _on_conflict_add(stmt).returning(models.DailyRevenue.user_id).cte("revenue")
+
+
+def daily_revenue_source():
+    price = func.coalesce(models.Appointments.price, 0)
+    net = price - price * (func.coalesce(models.Appointments.discount, 0) / 100.0)
+    day = cast(models.Appointments.date_of_appointment, Date)
+    return (
+        select(
+            models.Appointments.user_id,
+            day,
+            func.sum(price),
+            cast(func.sum(net), Numeric(12, 2)),
+            func.count(),
+        )
+        .where(models.Appointments.is_finished == True)
+        .group_by(models.Appointments.user_id, day)
+    )
+
+
+async def rebuild_daily_revenue(db: AsyncSession):
+    # параллельные finish/delete подождут на своём upsert до конца пересчёта
+    await db.execute(text("LOCK TABLE daily_revenue IN EXCLUSIVE MODE"))
+    await db.execute(delete(models.DailyRevenue))
+    await db.execute(
+        insert(models.DailyRevenue).from_select(
+            ["user_id", "day", "gross", "net", "count"], daily_revenue_source()
+        )
+    )
+    await db.commit()
+
+
+async def main():
+    from .db_init import async_session, engine
+
+    async with async_session() as db:
+        await rebuild_daily_revenue(db)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    # пересчёт сводки с нуля: cd backend && python -m src.rollups
+    asyncio.run(main())
@@ -1,5 +1,6 @@
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+from typing import Literal
 import datetime
 
 
@@ -24,6 +25,19 @@ class UserRead(UserBase):
         from_attributes = True
 
 
+class SpecialistRead(BaseModel):
+    id: int
+    f_name: str | None = None
+    l_name: str | None = None
+    m_name: str | None = None
+    baitursynov: bool = False
+    gagarina: bool = False
+    position: str | None = None
+
+    class Config:
+        from_attributes = True
+
+
 class UserShort(BaseModel):
     f_name: str | None
     l_name: str | None
@@ -75,6 +89,10 @@ class ClientRead(ClientBase):
     class Config:
         from_attributes = True
 
+class ClientPage(BaseModel):
+    items: list[ClientRead]
+    next_cursor: str | None = None
+
 class ClientShort(BaseModel):
     f_name: str | None
     l_name: str | None
@@ -125,3 +143,46 @@ class AppointmentRead(AppointmentBase):
     class Config:
         from_attributes = True
 
+
+class AppointmentPage(BaseModel):
+    items: list[AppointmentRead]
+    next_cursor: str | None = None
+
+
+class AppointmentDeleted(BaseModel):
+    id: int
+    user_id: int
+    date_of_appointment: datetime.datetime
+    deleted_at: datetime.datetime
+
+
+class AppointmentChanges(BaseModel):
+    changed: list[AppointmentRead]
+    deleted: list[AppointmentDeleted]
+    cursor: str
+    has_more: bool = False
+
+
+class AppointmentBulkItem(BaseModel):
+    date_of_appointment: datetime.datetime
+    user_id: int
+    client_id: int
+
+    price: int | None = None
+    course: str | None = None
+    discount: int | None = None
+    type_of_payment: str | None = None
+    type_of_massage: str | None = None
+    duration: int | None = None
+    service: str | None = None
+
+class AppointmentRecurrence(BaseModel):
+    frequency: Literal["daily", "weekly"] = "weekly"
+    interval: int = Field(1, ge=1, le=30)
+    count: int = Field(..., ge=1, le=100)
+
+class AppointmentBulkCreate(BaseModel):
+    appointments: list[AppointmentBulkItem] = []
+    # шаблон + правило повторения: template.date_of_appointment — первое занятие курса
+    template: AppointmentBulkItem | None = None
+    recurrence: AppointmentRecurrence | None = None
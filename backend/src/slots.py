@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+
+Interval = tuple[datetime, datetime]
+
+
+def merge_intervals(intervals: list[Interval]) -> list[Interval]:
+    # сортировка по началу и склейка пересекающихся/соприкасающихся интервалов
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_starts(
+    busy: list[Interval],
+    window_start: datetime,
+    window_end: datetime,
+    duration: timedelta,
+    step: timedelta,
+    not_before: datetime | None = None,
+) -> list[datetime]:
+    # один проход по занятым интервалам: в каждом промежутке между ними берём все начала
+    # на сетке step от window_start, после которых запись длиной duration ещё помещается
+    starts = []
+    for gap_start, gap_end in _gaps(merge_intervals(busy), window_start, window_end):
+        if not_before is not None and gap_start < not_before:
+            gap_start = not_before
+        # первое начало на сетке не раньше gap_start
+        cursor = window_start + -((window_start - gap_start) // step) * step
+        while cursor + duration <= gap_end:
+            starts.append(cursor)
+            cursor += step
+    return starts
+
+
+def _gaps(busy: list[Interval], window_start: datetime, window_end: datetime):
+    position = window_start
+    for start, end in busy:
+        if end <= position:
+            continue
+        if start >= window_end:
+            break
+        if start > position:
+            yield position, start
+        position = max(position, end)
+    if position < window_end:
+        yield position, window_end
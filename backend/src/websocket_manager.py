@@ -0,0 +1,156 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Callable
+
+from fastapi import WebSocket
+
+from .config import WS_QUEUE_SIZE, WS_OVERFLOW_POLICY, WS_MAX_SUBSCRIPTION_DAYS
+from .models import BRANCHES
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: asyncio.Task | None = None
+        # None — подписки нет, клиент получает все события
+        self.topics: set[tuple[str, str]] | None = None
+
+
+class ConnectionManager:
+    # у каждого сокета своя очередь и своя задача-писатель: broadcast только кладёт
+    # сообщение в очереди и сразу возвращается, медленный клиент тормозит только себя
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE, overflow_policy: str = WS_OVERFLOW_POLICY):
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.active_connections: dict[WebSocket, Connection] = {}
+        # (филиал, дата) -> сокеты, подписанные на этот день
+        self.topics: dict[tuple[str, str], set[WebSocket]] = defaultdict(set)
+        self.unsubscribed: set[WebSocket] = set()
+        self.sent_messages = 0
+        self.dropped_messages = 0
+        self.evicted_connections = 0
+        self.backplane = None
+        # вызываются на каждое событие в каждом воркере (в т.ч. пришедшее через backplane) —
+        # например, для сброса кэшей
+        self.listeners: list[Callable[[dict], None]] = []
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        connection = Connection(websocket, self.queue_size)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.active_connections[websocket] = connection
+        self.unsubscribed.add(websocket)
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.active_connections.pop(websocket, None)
+        self.unsubscribed.discard(websocket)
+        if connection is None:
+            return
+        self._drop_topics(connection)
+        if connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    def subscribe(self, websocket: WebSocket, branch: str, date_from: date, date_to: date):
+        # новая подписка заменяет прежнюю; branch="all" — оба филиала
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            return
+        self._drop_topics(connection)
+        self.unsubscribed.discard(websocket)
+
+        days = max(0, min((date_to - date_from).days + 1, WS_MAX_SUBSCRIPTION_DAYS))
+        connection.topics = set()
+        for offset in range(days):
+            key = (branch, (date_from + timedelta(days=offset)).isoformat())
+            self.topics[key].add(websocket)
+            connection.topics.add(key)
+
+    def _drop_topics(self, connection: Connection):
+        for key in connection.topics or ():
+            subscribers = self.topics.get(key)
+            if subscribers is not None:
+                subscribers.discard(connection.websocket)
+                if not subscribers:
+                    del self.topics[key]
+        connection.topics = None
+
+    def _recipients(self, message: dict) -> set[WebSocket]:
+        # событие относится к одной дате ("date") или к нескольким ("dates")
+        days = message.get("dates") or ([message["date"]] if message.get("date") else None)
+        if not days:
+            return set(self.active_connections)
+
+        # "branches" — все филиалы специалиста; без них событие касается обоих
+        branches = [b for b in message.get("branches") or () if b in BRANCHES] or list(BRANCHES)
+        branches.append("all")
+        recipients = set(self.unsubscribed)
+        for day in days:
+            for b in branches:
+                recipients |= self.topics.get((b, day), set())
+        return recipients
+
+    async def _write(self, connection: Connection):
+        try:
+            while True:
+                message = await connection.queue.get()
+                await connection.websocket.send_json(message)
+                self.sent_messages += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(connection.websocket)
+
+    def _enqueue(self, connection: Connection, message: dict):
+        try:
+            connection.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            self.dropped_messages += 1
+
+        if self.overflow_policy == "drop_oldest":
+            connection.queue.get_nowait()
+            connection.queue.put_nowait(message)
+        else:
+            self.evicted_connections += 1
+            self.disconnect(connection.websocket)
+            asyncio.create_task(self._close(connection.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            # 1013 — "try again later", фронтенд переподключится сам
+            await asyncio.wait_for(websocket.close(code=1013), timeout=5)
+        except Exception:
+            pass
+
+    def broadcast_local(self, message: dict):
+        for listener in self.listeners:
+            listener(message)
+        if message.get("internal"):
+            # служебные события (например, table_changed) нужны только воркерам, не браузерам
+            return
+        for websocket in self._recipients(message):
+            connection = self.active_connections.get(websocket)
+            if connection is not None:
+                self._enqueue(connection, message)
+
+    async def broadcast(self, message: dict):
+        # с backplane свои сокеты получат сообщение вместе со всеми через NOTIFY
+        if self.backplane is not None and await self.backplane.publish(message):
+            return
+        self.broadcast_local(message)
+
+    def stats(self) -> dict:
+        depths = [c.queue.qsize() for c in self.active_connections.values()]
+        return {
+            "connections": len(depths),
+            "subscribed_connections": len(depths) - len(self.unsubscribed),
+            "topics": len(self.topics),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent_messages": self.sent_messages,
+            "dropped_messages": self.dropped_messages,
+            "evicted_connections": self.evicted_connections,
+            "backplane": self.backplane.stats() if self.backplane is not None else None,
+        }
@@ -22,6 +22,7 @@ class BranchManager {
 
     
     notify_observers() {
+        websocketManager.subscribe(this.current_branch, this.current_date);
         this.observers.forEach(callback => {
             try {
                 callback(this.current_branch, this.current_date);
@@ -198,7 +199,7 @@ switch_branch(branch, target_element) {
         const currentBranch = this.get_current_branch();
         const currentDate = this.get_current_date();
         
-        return (data.branch === 'all' || data.branch === currentBranch) &&
+        return (currentBranch === 'all' || !data.branches || data.branches.includes(currentBranch)) &&
                data.date === currentDate;
     }
 }
@@ -123,13 +123,22 @@ function setupCalendarWebSocketListeners() {
             console.log('Skipping update - not relevant for current view', {
                 dataDate: data.date,
                 currentDate: branch_manager.get_current_date(),
-                dataBranch: data.branch,
+                dataBranches: data.branches,
                 currentBranch: branch_manager.get_current_branch()
             });
         }
     });
 
     
+    websocketManager.on('appointments_created', (data) => {
+        console.log('WebSocket: appointments_created received', data);
+        if ((data.dates || []).some(date => shouldUpdateCalendar({ ...data, date }))) {
+            loadAppointments(branch_manager.get_current_date());
+            showVisualNotification(`Добавлено записей: ${data.appointment_ids.length}`, 'success');
+        }
+    });
+
+    
     websocketManager.on('appointment_deleted', (data) => {
         console.log('WebSocket: appointment_deleted received', data);
         if (shouldUpdateCalendar(data)) {
@@ -156,14 +165,14 @@ function shouldUpdateCalendar(data) {
     const currentDate = branch_manager.get_current_date();
     
 
-    const shouldUpdate = (data.branch === 'all' || data.branch === currentBranch) &&
-                       data.date === currentDate;
+    const branchMatch = currentBranch === 'all' || !data.branches || data.branches.includes(currentBranch);
+    const shouldUpdate = branchMatch && data.date === currentDate;
     
     console.log('Should update calendar:', shouldUpdate, { 
         data, 
         currentBranch, 
         currentDate,
-        branchMatch: data.branch === 'all' || data.branch === currentBranch,
+        branchMatch,
         dateMatch: data.date === currentDate
     });
     return shouldUpdate;
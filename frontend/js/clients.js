@@ -1,16 +1,24 @@
 import { apiFetch } from "./auth.js"
 
 
-async function loadClients() {
+// курсор следующей страницы /clients; null — страниц больше нет
+let nextCursor = null
+
+
+async function loadClients(append = false) {
     try {
-        const response = await apiFetch("/clients")
+        const url = append && nextCursor ? `/clients?cursor=${encodeURIComponent(nextCursor)}` : "/clients"
+        const response = await apiFetch(url)
         if (!response.ok) throw new Error("Ошибка загрузки клиентов")
 
-        const clients = await response.json()
+        const page = await response.json()
+        nextCursor = page.next_cursor
+        document.getElementById("loadMoreClientsBtn").classList.toggle("d-none", !nextCursor)
+
         const tbody = document.getElementById("clientsTableBody")
-        tbody.innerHTML = ""
+        if (!append) tbody.innerHTML = ""
 
-        clients.forEach((client) => {
+        page.items.forEach((client) => {
             const row = document.createElement("tr")
             row.innerHTML = `
   <td>${client.id}</td>
@@ -28,15 +36,11 @@ async function loadClients() {
   </td>
 `
 
-            tbody.appendChild(row)
-        })
-
-        
-        tbody.querySelectorAll(".delete-client-btn").forEach((btn) => {
-            btn.addEventListener("click", () => {
-                const id = btn.dataset.id
-                deleteClient(id)
+            row.querySelector(".delete-client-btn").addEventListener("click", () => {
+                deleteClient(client.id)
             })
+
+            tbody.appendChild(row)
         })
     } catch (err) {
         console.error("Ошибка:", err)
@@ -113,4 +117,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
     
     document.getElementById("clientForm").addEventListener("submit", addClient)
+
+    
+    document.getElementById("loadMoreClientsBtn").addEventListener("click", () => loadClients(true))
 })
@@ -9,6 +9,7 @@ class ModalManager {
         this.currentDate = null;
         this.currentTime = null;
         this.existingAppointments = [];
+        this.clientSearchTimer = null;
         
         this.initEventListeners();
     }
@@ -20,6 +21,12 @@ class ModalManager {
             });
         });
 
+        document.getElementById('clientSearchInput').addEventListener('input', (e) => {
+            clearTimeout(this.clientSearchTimer);
+            const query = e.target.value.trim();
+            this.clientSearchTimer = setTimeout(() => this.searchClients(query), 300);
+        });
+
         document.getElementById('appointmentForm').addEventListener('submit', (e) => {
             e.preventDefault();
             this.createAppointment();
@@ -161,8 +168,42 @@ class ModalManager {
     }
 
     async loadFormData() {
-        await this.loadSelectOptions('/clients', 'clientSelect', 'f_name', 'l_name');
-        await this.loadSelectOptions('/specialists', 'specialistSelect', 'f_name', 'l_name');
+        document.getElementById('clientSearchInput').value = '';
+        this.fillSelect('clientSelect', [], 'f_name', 'l_name');
+        const branch = branch_manager.get_current_branch();
+        const endpoint = branch && branch !== 'all' ? `/specialists?branch=${branch}` : '/specialists';
+        await this.loadSelectOptions(endpoint, 'specialistSelect', 'f_name', 'l_name');
+    }
+
+    async searchClients(query) {
+        if (!query) {
+            this.fillSelect('clientSelect', [], 'f_name', 'l_name');
+            return;
+        }
+        await this.loadSelectOptions(`/clients/search?q=${encodeURIComponent(query)}`, 'clientSelect', 'f_name', 'l_name', 'phone');
+        const select = document.getElementById('clientSelect');
+        if (select.options.length === 2) {
+            select.selectedIndex = 1;
+        }
+    }
+
+    fillSelect(selectId, data, ...fields) {
+        const select = document.getElementById(selectId);
+
+        while (select.options.length > 1) {
+            select.remove(1);
+        }
+
+        data.forEach(item => {
+            const option = document.createElement('option');
+            option.value = item.id;
+
+            const textParts = fields.map(field => item[field] || '');
+            const displayText = textParts.filter(Boolean).join(' ');
+            option.textContent = displayText || `ID: ${item.id}`;
+
+            select.appendChild(option);
+        });
     }
 
     async loadSelectOptions(endpoint, selectId, ...fields) {
@@ -170,22 +211,7 @@ class ModalManager {
             const response = await apiFetch(endpoint);  
             if (response.ok) {
                 const data = await response.json();
-                const select = document.getElementById(selectId);
-
-                while (select.options.length > 1) {
-                    select.remove(1);
-                }
-
-                data.forEach(item => {
-                    const option = document.createElement('option');
-                    option.value = item.id;
-
-                    const textParts = fields.map(field => item[field] || '');
-                    const displayText = textParts.filter(Boolean).join(' ');
-                    option.textContent = displayText || `ID: ${item.id}`;
-
-                    select.appendChild(option);
-                });
+                this.fillSelect(selectId, data, ...fields);
 
                 console.log(`Загружены данные для ${selectId}:`, data);
             }
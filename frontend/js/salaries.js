@@ -30,6 +30,27 @@ async function loadSalaries(startDate, endDate) {
   }
 }
 
+async function downloadExport(url, fallbackName) {
+  try {
+    const response = await apiFetch(url);
+    if (!response.ok) throw new Error("Ошибка выгрузки");
+
+    const disposition = response.headers.get("Content-Disposition") || "";
+    const match = disposition.match(/filename="([^"]+)"/);
+    const blob = await response.blob();
+
+    const link = document.createElement("a");
+    link.href = URL.createObjectURL(blob);
+    link.download = match ? match[1] : fallbackName;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    URL.revokeObjectURL(link.href);
+  } catch (err) {
+    console.error("Ошибка:", err);
+  }
+}
+
 document.addEventListener("DOMContentLoaded", () => {
   loadSalaries();
 
@@ -38,4 +59,23 @@ document.addEventListener("DOMContentLoaded", () => {
     const end = document.getElementById("endDate").value;
     loadSalaries(start, end);
   });
+
+  document.getElementById("exportSalariesBtn").addEventListener("click", () => {
+    const start = document.getElementById("startDate").value;
+    const end = document.getElementById("endDate").value;
+    let url = "/salaries/export?format=xlsx";
+    if (start && end) {
+      url += `&start_date=${start}&end_date=${end}`;
+    }
+    downloadExport(url, "salaries.xlsx");
+  });
+
+  document.getElementById("exportAppointmentsBtn").addEventListener("click", () => {
+    const start = document.getElementById("startDate").value;
+    const end = document.getElementById("endDate").value;
+    let url = "/appointments/export?format=xlsx";
+    if (start) url += `&date_from=${start}`;
+    if (end) url += `&date_to=${end}`;
+    downloadExport(url, "appointments.xlsx");
+  });
 });
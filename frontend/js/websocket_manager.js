@@ -9,6 +9,7 @@ class WebSocketManager {
         this.maxReconnectAttempts = 10;
         this.pendingMessages = [];
         this.connectionPromise = null;
+        this.subscription = null;
     }
 
     async connect() {
@@ -35,6 +36,9 @@ class WebSocketManager {
                     
                     
                     this.flushPendingMessages();
+                    if (this.subscription) {
+                        this.sendImmediate('subscribe', this.subscription);
+                    }
                     resolve(true);
                 };
 
@@ -128,6 +132,18 @@ class WebSocketManager {
         }
     }
 
+    // сервер присылает только события выбранного филиала и дат; после переподключения подписка повторяется
+    subscribe(branch, dateFrom, dateTo = dateFrom) {
+        this.subscription = { branch, date_from: dateFrom, date_to: dateTo };
+        if (this.isConnected) {
+            return this.sendImmediate('subscribe', this.subscription);
+        }
+        this.connect().catch(error => {
+            console.warn('Failed to connect for subscription:', error);
+        });
+        return false;
+    }
+
     handleMessage(data) {
         const { type, ...payload } = data;
         